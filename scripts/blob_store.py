@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Content-addressed store for downloaded assets, shared across posts.
+
+Every downloaded file is written once to ~/.cache/ccblog/blobs/<aa>/<sha256>
+and the post directory gets a hardlink to it (a plain copy if the blog lives
+on another filesystem). A URL index remembers which blob each URL produced, so
+a logo or figure reused by another post is linked from disk instead of being
+downloaded again.
+
+Because post files share their inode with the blob, nothing may open one
+for writing: anything that (re)writes a file in a post directory goes
+through save_bytes/save_chunks, or writes a temp file and os.replace()s it,
+so the old link is dropped instead of the blob being truncated.
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+from pathlib import Path
+
+CACHE_ROOT = Path(os.environ.get('CCBLOG_CACHE_DIR', Path.home() / '.cache' / 'ccblog'))
+STORE_DIR = CACHE_ROOT / 'blobs'
+# Append-only JSON Lines: {"url": ..., "sha256": ..., "size": ..., "content_type": ...}
+URL_INDEX = STORE_DIR / 'urls.jsonl'
+
+_lock = threading.Lock()
+_url_index = None
+
+
+def blob_path(digest):
+    """Return the store path for a SHA-256 hex digest."""
+    return STORE_DIR / digest[:2] / digest
+
+
+def intact(digest):
+    """True if the blob exists and still hashes to digest (no write went through a link)."""
+    path = blob_path(digest)
+    if not path.is_file():
+        return False
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            sha.update(chunk)
+    return sha.hexdigest() == digest
+
+
+def _commit(tmp_path, digest):
+    """Move a fully written temp file into place (no-op if the blob exists)."""
+    target = blob_path(digest)
+    if target.exists():
+        os.unlink(tmp_path)
+    else:
+        target.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(tmp_path, target)
+    return target
+
+
+def put_chunks(chunks):
+    """Stream chunks into the store while hashing; returns (digest, size)."""
+    STORE_DIR.mkdir(parents=True, exist_ok=True)
+    sha = hashlib.sha256()
+    size = 0
+    fd, tmp_path = tempfile.mkstemp(dir=STORE_DIR, prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            for chunk in chunks:
+                if chunk:
+                    sha.update(chunk)
+                    f.write(chunk)
+                    size += len(chunk)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    digest = sha.hexdigest()
+    _commit(tmp_path, digest)
+    return digest, size
+
+
+def put_bytes(data):
+    """Store a bytes object; returns its digest."""
+    return put_chunks([data])[0]
+
+
+def put_file(path):
+    """Store the contents of an existing file; returns its digest."""
+    with open(path, 'rb') as f:
+        return put_chunks(iter(lambda: f.read(1 << 20), b''))[0]
+
+
+def link(digest, dest):
+    """Materialise a blob at dest as a hardlink, falling back to a copy."""
+    source = blob_path(digest)
+    dest = Path(dest)
+    if dest.exists() or dest.is_symlink():
+        if dest.exists() and os.path.samefile(source, dest):
+            return dest
+        dest.unlink()
+    try:
+        os.link(source, dest)
+    except OSError:
+        # Different filesystem (or no hardlink support): keep a real copy
+        shutil.copyfile(source, dest)
+    return dest
+
+
+def _load_index():
+    global _url_index
+    if _url_index is None:
+        index = {}
+        if URL_INDEX.exists():
+            with open(URL_INDEX, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue  # Torn write from an interrupted run
+                    index[record['url']] = record
+        _url_index = index
+    return _url_index
+
+
+def lookup_url(url):
+    """Return the index record for url if its blob is still in the store."""
+    with _lock:
+        record = _load_index().get(url)
+    if record and blob_path(record['sha256']).exists():
+        return record
+    return None
+
+
+def remember_url(url, digest, size, content_type=None):
+    """Record that url produced the given blob."""
+    record = {'url': url, 'sha256': digest, 'size': size}
+    if content_type:
+        record['content_type'] = content_type
+    with _lock:
+        index = _load_index()
+        if index.get(url) == record:
+            return record
+        index[url] = record
+        STORE_DIR.mkdir(parents=True, exist_ok=True)
+        with open(URL_INDEX, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record) + '\n')
+    return record
+
+
+def link_cached(url, dest):
+    """If url was downloaded before (by any post), link it into dest and return its size."""
+    record = lookup_url(url)
+    if not record:
+        return None
+    link(record['sha256'], dest)
+    return record['size']
+
+
+def save_chunks(chunks, dest, url=None, content_type=None, min_size=1):
+    """
+    Write a download through the store into dest; returns the size in bytes.
+
+    The URL is only remembered for bodies of at least min_size bytes, so a
+    truncated or placeholder response is never served from the cache later.
+    """
+    digest, size = put_chunks(chunks)
+    link(digest, dest)
+    if url and size >= min_size:
+        remember_url(url, digest, size, content_type)
+    return size
+
+
+def save_bytes(data, dest, url=None, content_type=None, min_size=1):
+    """Same as save_chunks for an in-memory body."""
+    return save_chunks([data], dest, url, content_type, min_size)
+
+
+def read_bytes(digest):
+    """Return the contents of a stored blob."""
+    return blob_path(digest).read_bytes()
@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+"""
+Long-lived pool of warm Playwright browser contexts.
+
+Launching Chromium costs several seconds, which used to be paid by every
+Notion scrape. The pool launches the browser once, keeps a few contexts
+ready, and hands out a fresh page in one of them for each job. A context is
+closed and replaced after MAX_PAGES_PER_CONTEXT pages, and the whole browser
+is relaunched after MAX_PAGES_PER_BROWSER, which keeps memory bounded on long
+batches.
+
+Playwright's sync API is single-threaded, so a pool must be used from the
+thread that created it.
+
+wait_for_images() replaces fixed scroll timers and sleeps: it scrolls one
+viewport at a time and returns as soon as no image request is in flight and
+every <img> in the content has finished loading, or when a deadline passes.
+
+block_resources() installs a request-interception profile on a page, so
+fonts, media and trackers are aborted before they cost bandwidth or
+memory; images and first-party requests (the content API) always go
+through. Third-party scripts are only aborted by profiles that list the
+site's own hosts (first_party): client-rendered shells usually load their
+bundles from a CDN, so the generic 'content' profile lets scripts through.
+"""
+import atexit
+import time
+from collections import deque
+from contextlib import contextmanager
+from urllib.parse import urlparse
+from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeoutError
+
+POOL_SIZE = 2
+MAX_PAGES_PER_CONTEXT = 20
+MAX_PAGES_PER_BROWSER = 200
+
+# Analytics, telemetry and chat widgets: never needed to render content
+TRACKER_HOSTS = (
+    'google-analytics.com', 'googletagmanager.com', 'doubleclick.net', 'segment.com', 'segment.io',
+    'sentry.io', 'amplitude.com', 'mixpanel.com', 'hotjar.com', 'intercom.io', 'intercomcdn.com',
+    'facebook.net', 'fullstory.com', 'heapanalytics.com', 'datadoghq.com', 'browser-intake-datadoghq.com',
+    'statsig.com', 'statsigapi.net', 'launchdarkly.com', 'clarity.ms', 'linkedin.com', 'ads-twitter.com',
+)
+
+# Request-interception profiles, picked per site adapter (SiteAdapter.block_profile)
+#   types: resource types always aborted
+#   trackers: abort requests to TRACKER_HOSTS
+#   third_party_scripts: abort scripts not served by the page's site or first_party
+#       (opt-in: only for sites whose bundle hosts are all in first_party)
+#   first_party: extra hosts treated as the page's own
+BLOCK_PROFILES = {
+    'none': None,
+    'content': {
+        'types': ('font', 'media', 'websocket', 'eventsource', 'manifest', 'texttrack'),
+        'trackers': True,
+        'third_party_scripts': False,
+        'first_party': (),
+    },
+    'notion': {
+        'types': ('font', 'media', 'websocket', 'eventsource', 'manifest', 'texttrack'),
+        'trackers': True,
+        'third_party_scripts': True,
+        'first_party': ('notion.so', 'notion.site', 'notion-static.com'),
+    },
+}
+
+# Readiness polling for wait_for_images()
+READY_TIMEOUT = 20.0
+READY_POLL_MS = 50
+
+# Scrolls one screen towards the bottom of whatever actually scrolls (the
+# given container, the document, or else the largest scrollable element, as
+# in apps like Notion that scroll an inner div) and reports how many images
+# under the root have not decoded yet (complete with no naturalWidth is a
+# broken or still-empty image, so it counts as loading)
+_READY_STEP_JS = """
+([selector, scrollSelector]) => {
+    const scrolls = (el) => el.scrollHeight > el.clientHeight + 1;
+    let scroller = scrollSelector && document.querySelector(scrollSelector);
+    if (!scroller) {
+        scroller = window.__readyScroller;
+        if (!scroller || !scroller.isConnected || !scrolls(scroller)) {
+            scroller = document.scrollingElement || document.body;
+            if (!scrolls(scroller)) {
+                let area = 0;
+                for (const el of document.querySelectorAll('body *')) {
+                    if (scrolls(el) && /auto|scroll/.test(getComputedStyle(el).overflowY)
+                            && el.clientWidth * el.clientHeight > area) {
+                        scroller = el;
+                        area = el.clientWidth * el.clientHeight;
+                    }
+                }
+            }
+            window.__readyScroller = scroller;
+        }
+    }
+    const bottom = scroller.scrollHeight - scroller.clientHeight;
+    if (scroller.scrollTop < bottom) {
+        scroller.scrollTop += scroller.clientHeight;
+    }
+    const root = (selector && document.querySelector(selector)) || document;
+    let loading = 0;
+    for (const img of root.querySelectorAll('img')) {
+        if ((img.currentSrc || img.getAttribute('src')) && !(img.complete && img.naturalWidth > 0)) {
+            loading++;
+        }
+    }
+    return {atBottom: scroller.scrollTop >= bottom - 1, loading: loading};
+}
+"""
+
+DEFAULT_CONTEXT_OPTIONS = {
+    'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+}
+
+
+class BrowserPool:
+    """
+    Warm Chromium contexts that hand out pages.
+
+    Args:
+        size: Contexts kept ready
+        max_pages_per_context: Pages served before a context is recycled
+        max_pages_per_browser: Pages served before Chromium is relaunched
+        headless: Run Chromium headless
+        context_options: Keyword arguments for browser.new_context
+    """
+
+    def __init__(self, size=POOL_SIZE, max_pages_per_context=MAX_PAGES_PER_CONTEXT,
+                 max_pages_per_browser=MAX_PAGES_PER_BROWSER, headless=True, context_options=None):
+        self.size = size
+        self.max_pages_per_context = max_pages_per_context
+        self.max_pages_per_browser = max_pages_per_browser
+        self.headless = headless
+        self.context_options = dict(DEFAULT_CONTEXT_OPTIONS)
+        self.context_options.update(context_options or {})
+        self._playwright = None
+        self._browser = None
+        # [context, pages served] pairs ready for the next job
+        self._idle = deque()
+        self._browser_pages = 0
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def start(self):
+        """Launch Chromium and warm up the contexts (no-op if already running)."""
+        if self._playwright is None:
+            self._playwright = sync_playwright().start()
+        if self._browser is None:
+            print("Launching browser...")
+            self._browser = self._playwright.chromium.launch(headless=self.headless)
+            self._browser_pages = 0
+        while len(self._idle) < self.size:
+            self._idle.append(self._new_context())
+        return self
+
+    def _new_context(self):
+        return [self._browser.new_context(**self.context_options), 0]
+
+    def _restart_browser(self):
+        for context, _ in self._idle:
+            context.close()
+        self._idle.clear()
+        self._browser.close()
+        self._browser = None
+        self.start()
+
+    @contextmanager
+    def page(self):
+        """Yield a new page in a warm context; the page is closed afterwards."""
+        self.start()
+        entry = self._idle.popleft() if self._idle else self._new_context()
+        page = entry[0].new_page()
+        try:
+            yield page
+        finally:
+            page.close()
+            entry[1] += 1
+            self._browser_pages += 1
+            if entry[1] >= self.max_pages_per_context:
+                entry[0].close()
+                entry = self._new_context()
+            self._idle.append(entry)
+            if self._browser_pages >= self.max_pages_per_browser:
+                self._restart_browser()
+
+    def close(self):
+        """Close every context, the browser and Playwright itself."""
+        while self._idle:
+            self._idle.popleft()[0].close()
+        if self._browser is not None:
+            self._browser.close()
+            self._browser = None
+        if self._playwright is not None:
+            self._playwright.stop()
+            self._playwright = None
+
+
+def capture_image_responses(page):
+    """
+    Record the image responses page receives; returns {url: Response}.
+
+    Call before page.goto(). Every successful image response is stored under
+    its final URL and each URL of its redirect chain, so the caller can look
+    it up by whatever src the DOM reports. Bodies are not read here (body()
+    from inside an event handler would block the event loop); read them with
+    response.body() while the page is still open.
+    """
+    captured = {}
+
+    def on_response(response):
+        request = response.request
+        if request.resource_type != 'image' or not response.ok:
+            return
+        while request is not None:
+            captured.setdefault(request.url, response)
+            request = request.redirected_from
+
+    page.on('response', on_response)
+    return captured
+
+
+def _site(host):
+    """Registrable part of a host (last two labels; good enough for our sources)."""
+    return '.'.join(host.split('.')[-2:])
+
+
+def _host_in(host, domains):
+    return any(host == d or host.endswith('.' + d) for d in domains)
+
+
+def block_resources(page, profile='content', page_url=None):
+    """
+    Abort the requests profile does not need; returns {'blocked': count}.
+
+    profile is a BLOCK_PROFILES name or a dict of the same shape. Install
+    it before page.goto(page_url); page_url decides which scripts are first
+    party. Image requests are never blocked.
+    """
+    stats = {'blocked': 0}
+    if isinstance(profile, str):
+        profile = BLOCK_PROFILES[profile]
+    if not profile:
+        return stats
+
+    first_party = set(profile['first_party'])
+    if page_url:
+        first_party.add(_site(urlparse(page_url).hostname or ''))
+
+    def handle(route):
+        request = route.request
+        kind = request.resource_type
+        host = urlparse(request.url).hostname or ''
+        if kind != 'image' and (
+                kind in profile['types']
+                or (profile['trackers'] and _host_in(host, TRACKER_HOSTS))
+                or (profile['third_party_scripts'] and kind == 'script'
+                    and not _host_in(host, first_party))):
+            stats['blocked'] += 1
+            route.abort()
+        else:
+            route.continue_()
+
+    page.route('**/*', handle)
+    return stats
+
+
+def wait_for_images(page, timeout=READY_TIMEOUT, root_selector=None, scroll_selector=None):
+    """
+    Scroll through page until every lazy image has loaded; True if it did.
+
+    Readiness means: the page has been scrolled to the bottom, no image
+    request is pending, and every <img> under root_selector (the whole
+    document if None or not found) is complete with a naturalWidth, so a
+    broken image holds readiness until the timeout. Returns False if that
+    is not reached within timeout seconds. If root_selector is given, the
+    root is waited for first, so a client-rendered page is not reported
+    ready before its content exists.
+
+    scroll_selector names the element the site scrolls (e.g. Notion's
+    .notion-scroller); without it the document is scrolled, or the largest
+    scrollable container when the document itself does not scroll.
+    """
+    deadline = time.monotonic() + timeout
+    if root_selector:
+        try:
+            page.wait_for_selector(root_selector, timeout=timeout * 1000)
+        except PlaywrightTimeoutError:
+            print(f"  Content root {root_selector!r} did not appear, checking the whole page")
+            root_selector = None
+
+    pending = set()
+
+    def on_request(request):
+        if request.resource_type == 'image':
+            pending.add(request)
+
+    def on_done(request):
+        pending.discard(request)
+
+    events = (('request', on_request), ('requestfinished', on_done), ('requestfailed', on_done))
+    for event, handler in events:
+        page.on(event, handler)
+
+    try:
+        while True:
+            state = page.evaluate(_READY_STEP_JS, [root_selector, scroll_selector])
+            if state['atBottom'] and not state['loading'] and not pending:
+                return True
+            if time.monotonic() >= deadline:
+                print(f"  Images not ready after {timeout:.0f}s "
+                      f"({state['loading']} loading, {len(pending)} requests pending)")
+                return False
+            # Lets Playwright dispatch the request events while we wait
+            page.wait_for_timeout(READY_POLL_MS)
+    finally:
+        for event, handler in events:
+            page.remove_listener(event, handler)
+
+
+_pool = None
+
+
+def get_pool():
+    """Return the process-wide pool, starting it on first use (closed at exit)."""
+    global _pool
+    if _pool is None:
+        _pool = BrowserPool().start()
+        atexit.register(_pool.close)
+    return _pool
+
+
+def close_pool():
+    """Close the process-wide pool if it was started; get_pool() starts a new one."""
+    global _pool
+    if _pool is not None:
+        _pool.close()
+        _pool = None
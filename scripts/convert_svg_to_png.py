@@ -1,53 +1,152 @@
 #!/usr/bin/env python3
-"""Convert SVG files to PNG for WeChat compatibility."""
+"""Convert SVG files to PNG for WeChat compatibility.
 
+Usage: convert_svg_to_png.py [BLOG_DIR [WIDTH]]
+
+The rendering backend (cairosvg, else svglib) is probed once per run and the
+SVGs are rendered in a process pool. Rendered PNGs are kept in the blob store
+under the SVG's SHA-256 and the target width, so an unchanged diagram is
+linked from the cache instead of being rendered again on the next run.
+"""
+
+import json
 import os
-import subprocess
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 from pathlib import Path
+import blob_store
+from download_journal import file_sha256
+
+DEFAULT_WIDTH = 1200
+# {"<svg sha256>:<width>": "<png sha256>"}
+CACHE_INDEX = blob_store.CACHE_ROOT / 'svg_png.json'
+
+_backend = None
+
+def detect_backend():
+    """Return the first importable backend ('cairosvg' or 'svglib'), or None."""
+    global _backend
+    if _backend is None:
+        try:
+            import cairosvg  # noqa: F401
+            _backend = 'cairosvg'
+        except (ImportError, OSError):
+            # OSError: cairosvg is installed but the cairo library is missing
+            try:
+                from svglib.svglib import svg2rlg  # noqa: F401
+                from reportlab.graphics import renderPM  # noqa: F401
+                _backend = 'svglib'
+            except ImportError:
+                _backend = ''
+    return _backend or None
+
+def render_cairosvg(svg_path: Path, width: int = DEFAULT_WIDTH) -> bytes:
+    """Render SVG to PNG bytes using cairosvg."""
+    import cairosvg
+    return cairosvg.svg2png(url=str(svg_path), output_width=width)
+
+def render_svglib(svg_path: Path, width: int = DEFAULT_WIDTH) -> bytes:
+    """Render SVG to PNG bytes using svglib and reportlab."""
+    from svglib.svglib import svg2rlg
+    from reportlab.graphics import renderPM
 
-def convert_svg_to_png_cairosvg(svg_path: Path, png_path: Path, width: int = 1200):
-    """Convert SVG to PNG using cairosvg."""
+    drawing = svg2rlg(str(svg_path))
+    if not drawing:
+        raise ValueError("svglib could not parse the file")
+
+    # Scale to desired width while maintaining aspect ratio
+    scale = width / drawing.width
+    drawing.width = width
+    drawing.height = drawing.height * scale
+    drawing.scale(scale, scale)
+
+    return renderPM.drawToString(drawing, fmt='PNG')
+
+RENDERERS = {'cairosvg': render_cairosvg, 'svglib': render_svglib}
+
+def _render(svg_path, width, backend):
+    """Worker: render one SVG; returns (png bytes, None) or (None, error)."""
     try:
-        import cairosvg
-        cairosvg.svg2png(
-            url=str(svg_path),
-            write_to=str(png_path),
-            output_width=width
-        )
-        return True
-    except ImportError:
-        return False
+        return RENDERERS[backend](Path(svg_path), width), None
     except Exception as e:
-        print(f"Error converting {svg_path}: {e}")
-        return False
+        return None, str(e)
 
-def convert_svg_to_png_pillow(svg_path: Path, png_path: Path, width: int = 1200):
-    """Convert SVG to PNG using Pillow with svg2rlg."""
+def _load_cache():
     try:
-        from svglib.svglib import svg2rlg
-        from reportlab.graphics import renderPM
-
-        drawing = svg2rlg(str(svg_path))
-        if drawing:
-            # Scale to desired width while maintaining aspect ratio
-            scale = width / drawing.width
-            drawing.width = width
-            drawing.height = drawing.height * scale
-            drawing.scale(scale, scale)
-
-            renderPM.drawToFile(drawing, str(png_path), fmt='PNG')
-            return True
-    except ImportError:
-        return False
-    except Exception as e:
-        print(f"Error converting {svg_path}: {e}")
-        return False
+        with open(CACHE_INDEX, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _save_cache(cache):
+    CACHE_INDEX.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = CACHE_INDEX.with_suffix('.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(cache, f)
+    os.replace(tmp_path, CACHE_INDEX)
+
+def convert_all(svg_files, width: int = DEFAULT_WIDTH, workers=None):
+    """
+    Convert SVGs to PNGs next to them.
+
+    Args:
+        svg_files: SVG paths
+        width: Output width in pixels (height keeps the aspect ratio)
+        workers: Worker processes (defaults to the CPU count)
+
+    Returns:
+        {svg path: 'cached' | backend name | None on failure}
+    """
+    results = {}
+    cache = _load_cache()
+    todo = []
+
+    for svg_file in svg_files:
+        key = f"{file_sha256(svg_file)}:{width}"
+        digest = cache.get(key)
+        if digest and blob_store.blob_path(digest).exists():
+            blob_store.link(digest, svg_file.with_suffix('.png'))
+            results[svg_file] = 'cached'
+        else:
+            todo.append((svg_file, key))
+
+    if not todo:
+        return results
+
+    backend = detect_backend()
+    if backend is None:
+        print("No SVG backend available (pip install cairosvg, or svglib and reportlab)")
+        results.update((svg_file, None) for svg_file, _ in todo)
+        return results
+
+    paths = [str(svg_file) for svg_file, _ in todo]
+    workers = min(workers or os.cpu_count() or 1, len(todo))
+    if workers == 1:
+        rendered = [_render(path, width, backend) for path in paths]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            rendered = list(pool.map(_render, paths, repeat(width), repeat(backend)))
+
+    for (svg_file, key), (png, error) in zip(todo, rendered):
+        if png is None:
+            print(f"Error converting {svg_file}: {error}")
+            results[svg_file] = None
+            continue
+        digest = blob_store.put_bytes(png)
+        blob_store.link(digest, svg_file.with_suffix('.png'))
+        cache[key] = digest
+        results[svg_file] = backend
+
+    _save_cache(cache)
+    return results
 
 def main():
-    blog_dir = Path("/home/limo/ccblog/blog/llm-nondeterminism")
+    blog_dir = Path(sys.argv[1]) if len(sys.argv) > 1 else Path("/home/limo/ccblog/blog/llm-nondeterminism")
+    width = int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_WIDTH
 
     # Find all SVG files
-    svg_files = list(blog_dir.glob("*.svg"))
+    svg_files = sorted(blog_dir.glob("*.svg"))
 
     if not svg_files:
         print("No SVG files found")
@@ -55,31 +154,26 @@ def main():
 
     print(f"Found {len(svg_files)} SVG files to convert")
 
-    # Try different conversion methods
+    results = convert_all(svg_files, width)
     success_count = 0
 
     for svg_file in svg_files:
-        png_file = svg_file.with_suffix('.png')
-
-        # Try cairosvg first (better quality)
-        if convert_svg_to_png_cairosvg(svg_file, png_file):
-            print(f"✓ Converted (cairosvg): {svg_file.name}")
-            success_count += 1
-        elif convert_svg_to_png_pillow(svg_file, png_file):
-            print(f"✓ Converted (pillow): {svg_file.name}")
+        how = results.get(svg_file)
+        if how:
+            print(f"✓ Converted ({how}): {svg_file.name}")
             success_count += 1
         else:
             print(f"✗ Failed: {svg_file.name}")
 
     print(f"\nConverted {success_count}/{len(svg_files)} files")
 
-    # Update the markdown file to use .png instead of .svg
-    md_file = blog_dir / "defeating-nondeterminism-in-llm-inference.md"
-    if md_file.exists():
+    # Update the markdown files to use .png instead of .svg
+    for md_file in blog_dir.glob("*.md"):
         content = md_file.read_text()
         updated_content = content.replace('.svg)', '.png)')
-        md_file.write_text(updated_content)
-        print(f"\n✓ Updated markdown file to reference .png files")
+        if updated_content != content:
+            md_file.write_text(updated_content)
+            print(f"\n✓ Updated {md_file.name} to reference .png files")
 
 if __name__ == "__main__":
     main()
@@ -1,12 +1,19 @@
 #!/usr/bin/env python3
 """
 Debug script to see what HTML we're getting from the page
+
+Usage: debug_page.py [URL]
+
+Also reports whether page_fetch would use the static HTML or escalate to
+the headless browser.
 """
 
-import requests
-from bs4 import BeautifulSoup
+import sys
+import page_cache
+from html_parser import make_soup
+from page_fetch import shell_reason
 
-url = 'https://red.anthropic.com/2025/smart-contracts/'
+url = sys.argv[1] if len(sys.argv) > 1 else 'https://red.anthropic.com/2025/smart-contracts/'
 
 headers = {
     'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
@@ -16,8 +23,8 @@ headers = {
 
 print(f"Fetching: {url}")
 try:
-    response = requests.get(url, headers=headers, timeout=30)
-    print(f"Status code: {response.status_code}")
+    response = page_cache.fetch(url, headers=headers, timeout=30)
+    print(f"Status code: {response.status_code}{' (cached)' if response.from_cache else ''}")
     print(f"Content length: {len(response.content)}")
 
     # Save HTML for inspection
@@ -26,7 +33,7 @@ try:
     print("HTML saved to: /home/limo/ccblog/scripts/page.html")
 
     # Parse and look for images
-    soup = BeautifulSoup(response.content, 'html.parser')
+    soup = make_soup(response.content)
 
     # Check for all img tags
     all_imgs = soup.find_all('img')
@@ -54,6 +61,13 @@ try:
         if elements:
             print(f"  Found {len(elements)} elements with '{class_name}' in class")
 
+    # Same check page_fetch uses to decide between static HTML and the browser
+    reason = shell_reason(soup, response.text)
+    if reason:
+        print(f"\nClient-rendered shell ({reason}): page_fetch will render it in the browser")
+    else:
+        print("\nStatic HTML has the content: no browser needed")
+
 except Exception as e:
     print(f"Error: {e}")
     import traceback
@@ -3,11 +3,16 @@
 Download all images from arXiv article 2510.02425v1
 """
 
+import http_client
+import blob_store
 import requests
+from download_engine import backoff_delay
+from download_journal import DownloadJournal
+from rate_limit import THROTTLE_STATUSES, RetryAfterTooLong
 import json
+import time
 from pathlib import Path
 from urllib.parse import urljoin
-import time
 
 # Base URL for the article
 BASE_URL = "https://arxiv.org/html/2510.02425v1/"
@@ -16,6 +21,9 @@ BASE_URL = "https://arxiv.org/html/2510.02425v1/"
 OUTPUT_DIR = Path("/Users/limo/Documents/GithubRepo/ccblog/blog/arxiv-2510.02425-perceive")
 OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
 
+# Completed downloads are journaled as they finish, so an interrupted run resumes
+journal = DownloadJournal(OUTPUT_DIR)
+
 # List of all images to download based on the article structure
 images = []
 
@@ -38,6 +46,16 @@ results = {
     "skipped": []
 }
 
+def wait_before_retry(attempt, max_retries):
+    """
+    Jittered pause before the next attempt.
+
+    Only for failures the rate limiter does not pace: 4xx other than 429,
+    bodies that are not images and errors raised outside the request.
+    """
+    if attempt < max_retries - 1:
+        time.sleep(backoff_delay(attempt + 1))
+
 def download_image(image_path):
     """Download a single image with retry logic"""
     url = urljoin(BASE_URL, image_path)
@@ -51,25 +69,40 @@ def download_image(image_path):
 
     output_path = OUTPUT_DIR / filename
 
-    # Skip if already exists
-    if output_path.exists():
-        print(f"✓ Skipping (already exists): {filename}")
+    # Skip if an earlier run finished this file and it still matches the journal;
+    # a file left half-written by an interrupted run is downloaded again
+    if journal.completed(output_path, url):
+        print(f"✓ Skipping (verified in journal): {filename}")
         results["skipped"].append(filename)
         return True
 
+    # Reuse a copy downloaded earlier (by this or another post)
+    cached = blob_store.lookup_url(url)
+    if cached:
+        blob_store.link(cached['sha256'], output_path)
+        journal.record(output_path, url)
+        print(f"✓ Reused cached copy: {filename} ({cached['size']} bytes)")
+        results["successful"].append({
+            "filename": filename,
+            "original_url": url,
+            "size": cached['size'],
+            "content_type": cached.get('content_type', '')
+        })
+        return True
+
     # Try to download with retries
     max_retries = 3
     for attempt in range(max_retries):
         try:
             print(f"Downloading: {url} -> {filename} (attempt {attempt + 1}/{max_retries})")
-            response = requests.get(url, headers=headers, timeout=30)
+            response = http_client.get(url, headers=headers, timeout=30)
 
             if response.status_code == 200:
                 # Verify it's actually an image (not an error page)
                 content_type = response.headers.get('content-type', '')
                 if 'image' in content_type or len(response.content) > 1000:
-                    with open(output_path, 'wb') as f:
-                        f.write(response.content)
+                    blob_store.save_bytes(response.content, output_path, url=url, content_type=content_type)
+                    journal.record(output_path, url)
                     print(f"✓ Successfully downloaded: {filename} ({len(response.content)} bytes)")
                     results["successful"].append({
                         "filename": filename,
@@ -86,6 +119,7 @@ def download_image(image_path):
                             "url": url,
                             "error": f"Invalid content: {content_type}"
                         })
+                    wait_before_retry(attempt, max_retries)
                     continue
             elif response.status_code == 404:
                 print(f"✗ Not found (404): {filename}")
@@ -103,18 +137,25 @@ def download_image(image_path):
                         "url": url,
                         "error": f"HTTP {response.status_code}"
                     })
-                time.sleep(1)
+                # 429 and 5xx already slowed the host down in the rate limiter
+                if response.status_code < 500 and response.status_code not in THROTTLE_STATUSES:
+                    wait_before_retry(attempt, max_retries)
                 continue
 
         except Exception as e:
             print(f"✗ Error downloading {filename}: {e}")
-            if attempt == max_retries - 1:
+            # The server will not serve this for longer than we are willing to wait
+            if isinstance(e, RetryAfterTooLong) or attempt == max_retries - 1:
                 results["failed"].append({
                     "filename": filename,
                     "url": url,
                     "error": str(e)
                 })
-            time.sleep(1)
+            if isinstance(e, RetryAfterTooLong):
+                return False
+            # Connection errors and timeouts already slowed the host down
+            if not isinstance(e, requests.RequestException):
+                wait_before_retry(attempt, max_retries)
 
     return False
 
@@ -124,14 +165,14 @@ def main():
     print("-" * 80)
 
     for image_path in images:
+        # Pacing is handled per host by http_client's adaptive rate limiter
         download_image(image_path)
-        time.sleep(0.5)  # Be respectful to the server
 
     print("\n" + "=" * 80)
     print("DOWNLOAD SUMMARY")
     print("=" * 80)
     print(f"✓ Successfully downloaded: {len(results['successful'])} images")
-    print(f"○ Skipped (already exist): {len(results['skipped'])} images")
+    print(f"○ Skipped (verified from earlier run): {len(results['skipped'])} images")
     print(f"✗ Failed: {len(results['failed'])} images")
 
     if results['failed']:
@@ -5,14 +5,17 @@ Download all images from HuggingFace continuous batching blog post.
 
 import os
 import json
-import time
 import re
 from pathlib import Path
 from urllib.parse import urljoin, urlparse
-import requests
-from bs4 import BeautifulSoup
+import http_client
+import blob_store
+from html_parser import make_content_soup
 from PIL import Image
 from io import BytesIO
+from download_engine import download_all, reserve_path
+from download_journal import DownloadJournal
+from srcset import best_candidate
 
 # Configuration
 BLOG_URL = "https://huggingface.co/blog/continuous_batching"
@@ -59,42 +62,38 @@ def generate_meaningful_filename(img_url, alt_text, index):
     ext = os.path.splitext(original_name)[1] or '.jpg'
     return f"image-{index:02d}{ext}"
 
-def download_image(img_url, output_path, retries=3):
-    """Download an image with retry logic."""
-    for attempt in range(retries):
-        try:
-            response = requests.get(img_url, headers=HEADERS, timeout=30)
-            response.raise_for_status()
+def download_image(img_url, output_path):
+    """Download one image and return its size (retries are scheduled by download_engine)."""
+    # Reuse a copy downloaded earlier (by this or another post)
+    cached_size = blob_store.link_cached(img_url, output_path)
+    if cached_size:
+        return cached_size
 
-            # Verify it's a valid image
-            img = Image.open(BytesIO(response.content))
-            img.verify()
+    response = http_client.get(img_url, headers=HEADERS, timeout=30)
+    response.raise_for_status()
 
-            # Save the image
-            with open(output_path, 'wb') as f:
-                f.write(response.content)
+    # Verify it's a valid image
+    img = Image.open(BytesIO(response.content))
+    img.verify()
 
-            return True, len(response.content)
-        except Exception as e:
-            if attempt < retries - 1:
-                time.sleep(2 ** attempt)  # Exponential backoff
-                continue
-            return False, str(e)
+    # Save the image through the shared asset store
+    blob_store.save_bytes(response.content, output_path, url=img_url)
 
-    return False, "Max retries exceeded"
+    return len(response.content)
 
 def scrape_blog_images():
     """Scrape images from the blog post."""
     print(f"Fetching blog post: {BLOG_URL}")
 
     try:
-        response = requests.get(BLOG_URL, headers=HEADERS, timeout=30)
+        response = http_client.get(BLOG_URL, headers=HEADERS, timeout=30)
         response.raise_for_status()
     except Exception as e:
         print(f"Error fetching blog post: {e}")
         return []
 
-    soup = BeautifulSoup(response.content, 'html.parser')
+    # Only the article/main subtrees are built (full parse if the page has neither)
+    soup = make_content_soup(response.content, content_tags=('article', 'main'))
 
     # Find the main article content
     # HuggingFace blog posts typically use specific container classes
@@ -141,7 +140,7 @@ def scrape_blog_images():
     for picture in article.find_all('picture'):
         source = picture.find('source')
         if source:
-            img_url = source.get('srcset', '').split(',')[0].split()[0]
+            img_url = best_candidate(source.get('srcset', ''), source.get('sizes'))
             if img_url:
                 img_url = urljoin(BLOG_URL, img_url)
                 images.append({
@@ -169,10 +168,11 @@ def main():
 
     print(f"\nFound {len(images)} images")
 
-    # Download images
-    manifest = []
-    successful = 0
-    failed = 0
+    # Plan filenames up front so downloads can run concurrently; the journal
+    # lets an interrupted run pick up where it stopped
+    journal = DownloadJournal(OUTPUT_DIR)
+    jobs = []
+    reserved = set()
 
     for idx, img_info in enumerate(images, 1):
         img_url = img_info['url']
@@ -182,35 +182,38 @@ def main():
         filename = generate_meaningful_filename(img_url, alt_text, idx)
 
         # Handle duplicates
-        output_path = OUTPUT_DIR / filename
-        counter = 1
-        base_name, ext = os.path.splitext(filename)
-        while output_path.exists():
-            filename = f"{base_name}-{counter}{ext}"
-            output_path = OUTPUT_DIR / filename
-            counter += 1
+        output_path = reserve_path(OUTPUT_DIR, filename, reserved, sep='-', journal=journal, url=img_url)
 
-        print(f"\n[{idx}/{len(images)}] Downloading: {img_url}")
-        print(f"  -> Saving as: {filename}")
+        print(f"[{idx}/{len(images)}] Queued: {img_url}")
+        print(f"  -> Saving as: {output_path.name}")
+        jobs.append({'url': img_url, 'path': output_path, 'alt': alt_text})
 
-        success, result = download_image(img_url, output_path)
+    # Download images
+    results = download_all(jobs, lambda job: download_image(job['url'], job['path']), journal=journal)
+
+    manifest = []
+    successful = 0
+    failed = []
 
-        if success:
-            print(f"  ✓ Success ({result} bytes)")
+    for r in results:
+        filename = r.job['path'].name
+        if r.ok:
+            print(f"  ✓ {filename} ({r.value} bytes)")
             successful += 1
             manifest.append({
                 'filename': filename,
-                'original_url': img_url,
-                'alt_text': alt_text,
-                'size_bytes': result,
+                'original_url': r.job['url'],
+                'alt_text': r.job['alt'],
+                'size_bytes': r.value,
             })
         else:
-            print(f"  ✗ Failed: {result}")
-            failed += 1
+            print(f"  ✗ {filename} failed after {r.attempts} attempts: {r.error}")
+            failed.append({'url': r.job['url'], 'alt': r.job['alt'],
+                           'attempts': r.attempts, 'error': r.error})
 
     # Save manifest
     with open(MANIFEST_FILE, 'w') as f:
-        json.dump(manifest, f, indent=2)
+        json.dump({'images': manifest, 'failed': failed}, f, indent=2)
 
     # Print summary
     print("\n" + "="*60)
@@ -218,7 +221,7 @@ def main():
     print("="*60)
     print(f"Total images found: {len(images)}")
     print(f"Successfully downloaded: {successful}")
-    print(f"Failed downloads: {failed}")
+    print(f"Failed downloads: {len(failed)}")
     print(f"Output directory: {OUTPUT_DIR}")
     print(f"Manifest file: {MANIFEST_FILE}")
 
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Shared concurrent download engine used by the image downloaders.
+
+Each script keeps its own blocking fetch function (requests based); the engine
+runs those calls on worker threads from an asyncio event loop, bounded by a
+global concurrency limit and a per-host limit so a single CDN is never
+hammered. A failed job is parked on a delayed retry queue (exponential backoff
+with jitter) without holding a download slot, so one flaky URL never stalls
+the rest of the post. Results come back in the same order as the jobs so
+callers can build their images.json manifest exactly as before.
+
+With a DownloadJournal, every completed file is journaled straight away and
+files verified by an earlier (possibly interrupted) run are not fetched again.
+"""
+import asyncio
+import os
+import random
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+from rate_limit import RetryAfterTooLong
+
+# Defaults tuned for blog-sized posts (tens of figures on one or two hosts)
+MAX_CONCURRENCY = 16
+PER_HOST_LIMIT = 6
+
+# Failed downloads are retried later instead of inline
+MAX_ATTEMPTS = 3
+BACKOFF_BASE = 1.0   # seconds; doubles with every attempt
+BACKOFF_CAP = 30.0
+
+DownloadResult = namedtuple('DownloadResult', ['job', 'ok', 'value', 'error', 'attempts'])
+
+
+def _host(url):
+    """Return the lower-cased host of a URL (used as the per-host key)."""
+    return urlparse(url).netloc.lower()
+
+
+def backoff_delay(attempt):
+    """Exponential backoff with full jitter for the given (1-based) failed attempt."""
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+
+
+async def _run(jobs, fetch, max_concurrency, per_host, max_attempts, journal):
+    global_limit = asyncio.Semaphore(max_concurrency)
+    host_limits = {}
+
+    async def attempt(job):
+        host = _host(job['url'])
+        host_limit = host_limits.setdefault(host, asyncio.Semaphore(per_host))
+        async with host_limit, global_limit:
+            try:
+                value = await asyncio.to_thread(fetch, job)
+            except RetryAfterTooLong as e:
+                # The server will not serve this for longer than we wait: give up
+                return False, None, str(e), False
+            except Exception as e:
+                return False, None, str(e), True
+        if value:
+            return True, value, None, False
+        return False, value, 'download failed', True
+
+    async def run_one(job):
+        job_journal = job.get('journal') or journal
+        journaled = job_journal is not None and 'path' in job
+        if journaled:
+            record = await asyncio.to_thread(job_journal.completed, job['path'], job['url'])
+            if record:
+                print(f"  Resumed (verified): {os.path.basename(job['path'])} ({record['size']} bytes)")
+                return DownloadResult(job, True, record['size'], None, 0)
+
+        for n in range(1, max_attempts + 1):
+            ok, value, error, retry = await attempt(job)
+            if ok and journaled and os.path.exists(job['path']):
+                await asyncio.to_thread(job_journal.record, job['path'], job['url'])
+            if ok or not retry or n == max_attempts:
+                return DownloadResult(job, ok, value, error, n)
+            # Park the job on the delayed retry queue; it holds no download
+            # slot while waiting, so the rest of the post keeps downloading
+            delay = backoff_delay(n)
+            print(f"  Retrying {job['url'][:80]} in {delay:.1f}s (attempt {n}/{max_attempts} failed: {error})")
+            await asyncio.sleep(delay)
+
+    if isinstance(jobs, list):
+        return await asyncio.gather(*(run_one(job) for job in jobs))
+
+    # Lazy job source (e.g. a page that is still downloading): pull each job
+    # on a worker thread and start it at once, so producing jobs and
+    # downloading them overlap
+    tasks = []
+    iterator = iter(jobs)
+    while True:
+        job = await asyncio.to_thread(next, iterator, None)
+        if job is None:
+            break
+        tasks.append(asyncio.create_task(run_one(job)))
+    return await asyncio.gather(*tasks)
+
+
+def download_all(jobs, fetch, max_concurrency=MAX_CONCURRENCY, per_host=PER_HOST_LIMIT,
+                 max_attempts=MAX_ATTEMPTS, journal=None):
+    """
+    Run fetch(job) for every job concurrently.
+
+    Args:
+        jobs: List of dicts, each with at least a 'url' key; any other
+            iterable (e.g. a generator) is consumed lazily and each job
+            starts as soon as it is produced
+        fetch: Blocking callable taking a job and making a single attempt; a
+            truthy return value means success, a falsy value or an exception
+            means failure (rate_limit.RetryAfterTooLong is not retried)
+        max_concurrency: Maximum number of downloads in flight overall
+        per_host: Maximum number of downloads in flight per host
+        max_attempts: Attempts per job; failures are retried after a jittered
+            exponential backoff while other jobs keep running
+        journal: Optional DownloadJournal; jobs with a 'path' are journaled as
+            they complete, and already verified files are skipped (their
+            result has attempts=0 and the journaled size as value); a job's
+            own 'journal' key overrides it, for runs spanning several posts
+
+    Returns:
+        List of DownloadResult(job, ok, value, error, attempts) in job order
+    """
+    if isinstance(jobs, (list, tuple)):
+        jobs = list(jobs)
+        if not jobs:
+            return []
+    run = _run(jobs, fetch, max_concurrency, per_host, max_attempts, journal)
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(run)
+    # The caller is inside a running event loop (sync Playwright keeps one
+    # alive), where asyncio.run refuses to start: use a loop on a worker thread
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, run).result()
+
+
+def reserve_path(output_dir, filename, reserved, sep='_', journal=None, url=None):
+    """
+    Pick a free path for filename in output_dir, appending a counter on clashes.
+
+    Because downloads now run concurrently, files do not exist yet when the
+    next name is chosen, so names handed out earlier are tracked in reserved.
+    A file that the journal says an earlier run wrote for the same url is not
+    a clash, so a resumed run keeps its filenames.
+    """
+    stem, ext = os.path.splitext(filename)
+    path = output_dir / filename
+    counter = 1
+    while path.name in reserved or (path.exists() and not (journal and journal.owns(path.name, url))):
+        path = output_dir / f"{stem}{sep}{counter}{ext}"
+        counter += 1
+    reserved.add(path.name)
+    return path
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Crash-resumable download journal.
+
+images.json is only written once a run finishes, so an interrupted run used to
+lose track of what it had already fetched. The journal is an append-only JSON
+Lines file next to images.json; a line is written (and fsynced) as soon as
+each file completes, recording its URL, size and SHA-256. On the next run a
+journaled file is reused only if it is still on disk with the same size and
+hash, so truncated or corrupted files are downloaded again.
+"""
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+
+JOURNAL_NAME = '.images.journal.jsonl'
+
+
+def file_sha256(path):
+    """Return the SHA-256 hex digest of a file."""
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+class DownloadJournal:
+    """Per-directory record of completed downloads, keyed by filename."""
+
+    def __init__(self, output_dir, name=JOURNAL_NAME):
+        self.output_dir = Path(output_dir)
+        self.path = self.output_dir / name
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._load()
+
+    def _load(self):
+        if not self.path.exists():
+            return
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # Torn last line from an interrupted run
+                self._entries[record['filename']] = record
+
+    def __len__(self):
+        return len(self._entries)
+
+    def entry(self, filename):
+        """Return the journal record for filename, or None."""
+        with self._lock:
+            return self._entries.get(filename)
+
+    def owns(self, filename, url):
+        """True if filename was written for url by an earlier run."""
+        record = self.entry(filename)
+        return bool(record) and record['url'] == url
+
+    def completed(self, path, url):
+        """
+        Return the journal record if path already holds a verified download of url.
+
+        The file must still exist with the journaled size and hash; anything
+        else (missing, truncated, overwritten) means it has to be fetched again.
+        """
+        path = Path(path)
+        record = self.entry(path.name)
+        if not record or record['url'] != url:
+            return None
+        try:
+            if path.stat().st_size != record['size']:
+                return None
+        except OSError:
+            return None
+        if file_sha256(path) != record['sha256']:
+            return None
+        return record
+
+    def record(self, path, url, **extra):
+        """Append a completed download to the journal and return its record."""
+        path = Path(path)
+        record = {
+            'filename': path.name,
+            'url': url,
+            'size': path.stat().st_size,
+            'sha256': file_sha256(path),
+        }
+        record.update(extra)
+        with self._lock:
+            self.output_dir.mkdir(parents=True, exist_ok=True)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+            self._entries[path.name] = record
+        return record
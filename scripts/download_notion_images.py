@@ -2,13 +2,15 @@
 """
 Download images from Notion page.
 """
-import os
 import json
 import re
-import requests
+import http_client
+import blob_store
+import cdn_rewrite
 from pathlib import Path
 from urllib.parse import urlparse, unquote
-import time
+from download_engine import download_all, reserve_path
+from download_journal import DownloadJournal
 
 def sanitize_filename(filename):
     """Remove special characters and spaces from filename."""
@@ -33,43 +35,35 @@ def extract_meaningful_name(url):
         return name
     return None
 
-def download_image(url, output_path, retries=3):
-    """Download an image with retry logic."""
+def download_image(url, output_path):
+    """Download an image (a single attempt; download_engine retries failures)."""
     headers = {
         'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
         'Referer': 'https://notion.site/',
         'Accept': 'image/avif,image/webp,image/apng,image/svg+xml,image/*,*/*;q=0.8',
     }
 
-    for attempt in range(retries):
-        try:
-            print(f"  Downloading (attempt {attempt + 1}/{retries})...")
-            response = requests.get(url, headers=headers, timeout=30, stream=True)
-            response.raise_for_status()
+    # Ask the CDN for the width the optimization stage scales to
+    fetch_url = cdn_rewrite.rewrite(url)
 
-            # Write to file
-            with open(output_path, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    f.write(chunk)
+    # Reuse a copy downloaded earlier (by this or another post)
+    cached_size = blob_store.link_cached(fetch_url, output_path)
+    if cached_size:
+        print(f"  {output_path.name}: reused cached copy ({cached_size} bytes)")
+        return True
 
-            # Verify file size
-            file_size = os.path.getsize(output_path)
-            if file_size < 100:  # Suspiciously small
-                print(f"  Warning: File size is only {file_size} bytes")
-                return False
+    response = http_client.get(fetch_url, headers=headers, timeout=30, stream=True)
+    response.raise_for_status()
 
-            print(f"  Success! Downloaded {file_size} bytes")
-            return True
+    # Write through the shared asset store
+    file_size = blob_store.save_chunks(response.iter_content(chunk_size=8192), output_path, url=fetch_url, min_size=100)
 
-        except Exception as e:
-            print(f"  Attempt {attempt + 1} failed: {e}")
-            if attempt < retries - 1:
-                time.sleep(2)  # Wait before retry
-            else:
-                print(f"  Failed after {retries} attempts")
-                return False
+    # Verify file size
+    if file_size < 100:  # Suspiciously small
+        raise ValueError(f"file size is only {file_size} bytes")
 
-    return False
+    print(f"  {output_path.name}: downloaded {file_size} bytes")
+    return True
 
 def main():
     # Image data from Playwright extraction
@@ -207,10 +201,11 @@ def main():
     # Create output directory
     output_dir.mkdir(parents=True, exist_ok=True)
 
-    # Download images
-    manifest = []
-    successful = 0
-    failed = []
+    # Plan filenames up front so downloads can run concurrently; the journal
+    # lets an interrupted run pick up where it stopped
+    journal = DownloadJournal(output_dir)
+    jobs = []
+    reserved = set()
 
     for idx, img_info in enumerate(images, 1):
         url = img_info['url']
@@ -233,26 +228,32 @@ def main():
             filename = f"figure_{idx:03d}.png"
 
         # Handle duplicates
-        output_path = output_dir / filename
-        counter = 1
-        while output_path.exists():
-            name, ext = os.path.splitext(filename)
-            output_path = output_dir / f"{name}_{counter}{ext}"
-            counter += 1
+        output_path = reserve_path(output_dir, filename, reserved, journal=journal, url=url)
 
         print(f"  Saving to: {output_path}")
+        jobs.append({'url': url, 'path': output_path, 'alt': alt, 'desc': desc})
+
+    # Download
+    results = download_all(jobs, lambda job: download_image(job['url'], job['path']), journal=journal)
+
+    manifest = []
+    successful = 0
+    failed = []
 
-        # Download
-        if download_image(url, output_path):
+    for result in results:
+        job = result.job
+        output_path = job['path']
+        if result.ok:
             successful += 1
             manifest.append({
                 'filename': output_path.name,
-                'original_url': url,
-                'alt_text': alt,
-                'description': desc
+                'original_url': job['url'],
+                'alt_text': job['alt'],
+                'description': job['desc']
             })
         else:
-            failed.append({'url': url, 'alt': alt, 'desc': desc})
+            failed.append({'url': job['url'], 'alt': job['alt'], 'desc': job['desc'],
+                           'attempts': result.attempts, 'error': result.error})
             # Remove failed download file if it exists
             if output_path.exists():
                 output_path.unlink()
@@ -260,7 +261,7 @@ def main():
     # Save manifest
     manifest_path = output_dir / 'images.json'
     with open(manifest_path, 'w') as f:
-        json.dump(manifest, f, indent=2)
+        json.dump({'images': manifest, 'failed': failed}, f, indent=2)
 
     # Print summary
     print("\n" + "="*60)
@@ -277,6 +278,7 @@ def main():
         for f in failed:
             print(f"  - {f['url'][:80]}...")
             print(f"    Alt: {f['alt']}, Desc: {f['desc']}")
+            print(f"    Error after {f['attempts']} attempts: {f['error']}")
 
     # Verify no spaces in filenames
     print("\nVerifying filenames...")
@@ -9,8 +9,9 @@ import re
 import sys
 from pathlib import Path
 from urllib.parse import urljoin, urlparse
-import requests
-from bs4 import BeautifulSoup
+import http_client
+import blob_store
+from html_parser import make_soup
 
 def sanitize_filename(filename):
     """Remove special characters and spaces from filename."""
@@ -54,7 +55,7 @@ def download_images(html_file, base_url, output_dir):
 
     # Read and parse HTML
     with open(html_file, 'r', encoding='utf-8') as f:
-        soup = BeautifulSoup(f.read(), 'html.parser')
+        soup = make_soup(f.read())
 
     # Find all image tags
     img_tags = soup.find_all('img')
@@ -65,12 +66,11 @@ def download_images(html_file, base_url, output_dir):
     failed = []
     manifest = []
 
-    # Set up session with headers
-    session = requests.Session()
-    session.headers.update({
+    # Headers sent with every image request (connections come from the shared pool)
+    headers = {
         'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
         'Referer': base_url
-    })
+    }
 
     for idx, img in enumerate(img_tags, 1):
         img_src = img.get('src') or img.get('data-src')
@@ -103,10 +103,24 @@ def download_images(html_file, base_url, output_dir):
 
         # Download image with retries
         print(f"Downloading [{idx}/{len(img_tags)}]: {filename}")
+
+        # Reuse a copy downloaded earlier (by this or another post)
+        cached_size = blob_store.link_cached(img_url, output_path)
+        if cached_size:
+            downloaded.append(filename)
+            manifest.append({
+                'filename': filename,
+                'original_url': img_url,
+                'alt_text': img.get('alt', ''),
+                'size_bytes': cached_size
+            })
+            print(f"  ✓ Reused cached copy: {filename} ({cached_size} bytes)")
+            continue
+
         success = False
         for attempt in range(3):
             try:
-                response = session.get(img_url, timeout=30)
+                response = http_client.get(img_url, headers=headers, timeout=30)
                 response.raise_for_status()
 
                 # Verify it's actually an image
@@ -114,9 +128,8 @@ def download_images(html_file, base_url, output_dir):
                 if not content_type.startswith('image/'):
                     print(f"  Warning: Content type is {content_type}, not an image")
 
-                # Save image
-                with open(output_path, 'wb') as f:
-                    f.write(response.content)
+                # Save image through the shared asset store
+                blob_store.save_bytes(response.content, output_path, url=img_url, content_type=content_type)
 
                 # Verify file was written
                 if output_path.stat().st_size > 0:
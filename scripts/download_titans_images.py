@@ -3,13 +3,16 @@
 Script to download all images from the Google Research Titans + MIRAS blog post.
 """
 
-import requests
-from bs4 import BeautifulSoup
+import http_client
+import blob_store
+import cdn_rewrite
+from html_parser import make_soup
 from pathlib import Path
 from urllib.parse import urljoin, urlparse
 import json
-import time
 import re
+from download_engine import download_all
+from download_journal import DownloadJournal
 
 def sanitize_filename(filename):
     """Remove spaces and special characters from filename."""
@@ -40,6 +43,17 @@ def get_meaningful_filename(img_tag, img_url, index):
     # Default to numbered
     return f"image_{index:03d}"
 
+def fetch_image(img_url, headers):
+    """Fetch an image and return (content_type, body); download_engine retries failures."""
+    # Reuse a copy downloaded earlier (by this or another post)
+    cached = blob_store.lookup_url(img_url)
+    if cached:
+        return cached.get('content_type', ''), blob_store.read_bytes(cached['sha256'])
+
+    img_response = http_client.get(img_url, headers=headers, timeout=30)
+    img_response.raise_for_status()
+    return img_response.headers.get('content-type', ''), img_response.content
+
 def download_images(url, output_dir):
     """Download all images from the blog post."""
 
@@ -54,10 +68,10 @@ def download_images(url, output_dir):
     }
 
     # Get the page
-    response = requests.get(url, headers=headers, timeout=30)
+    response = http_client.get(url, headers=headers, timeout=30)
     response.raise_for_status()
 
-    soup = BeautifulSoup(response.content, 'html.parser')
+    soup = make_soup(response.content)
 
     # Find the main article content
     main_content = soup.find('main') or soup.find('article') or soup.find('body')
@@ -94,9 +108,9 @@ def download_images(url, output_dir):
 
     print(f"Filtered to {len(content_images)} content images")
 
-    # Download images
-    downloaded = []
-    manifest = []
+    # Collect download jobs; the journal lets an interrupted run keep its filenames
+    journal = DownloadJournal(output_path)
+    jobs = []
 
     for idx, img in enumerate(content_images, 1):
         src = img.get('src', '') or img.get('data-src', '')
@@ -107,72 +121,78 @@ def download_images(url, output_dir):
         # Make URL absolute
         img_url = urljoin(url, src)
 
+        print(f"[{idx}/{len(content_images)}] Queued: {img_url}")
+        # Ask the CDN for the width the optimization stage scales to
+        jobs.append({'url': img_url, 'fetch_url': cdn_rewrite.rewrite(img_url), 'img': img, 'index': idx})
+
+    # Download concurrently, then save in page order
+    results = download_all(jobs, lambda job: fetch_image(job['fetch_url'], headers))
+
+    downloaded = []
+    manifest = []
+    failed = []
+
+    for result in results:
+        img = result.job['img']
+        img_url = result.job['url']
+        idx = result.job['index']
+
         print(f"\n[{idx}/{len(content_images)}] Processing: {img_url}")
 
-        try:
-            # Download with retry logic
-            max_retries = 3
-            for retry in range(max_retries):
-                try:
-                    img_response = requests.get(img_url, headers=headers, timeout=30)
-                    img_response.raise_for_status()
-                    break
-                except Exception as e:
-                    if retry < max_retries - 1:
-                        print(f"  Retry {retry + 1}/{max_retries} after error: {e}")
-                        time.sleep(2)
-                    else:
-                        raise
-
-            # Determine file extension
-            content_type = img_response.headers.get('content-type', '')
-            if 'image/jpeg' in content_type or 'image/jpg' in content_type:
-                ext = '.jpg'
-            elif 'image/png' in content_type:
-                ext = '.png'
-            elif 'image/gif' in content_type:
-                ext = '.gif'
-            elif 'image/webp' in content_type:
-                ext = '.webp'
-            elif 'image/svg' in content_type:
-                ext = '.svg'
-            else:
-                # Try to get from URL
-                ext = Path(urlparse(img_url).path).suffix or '.jpg'
-
-            # Generate filename
-            base_name = get_meaningful_filename(img, img_url, idx)
-            filename = f"{base_name}{ext}"
-
-            # Handle duplicates
+        if not result.ok:
+            print(f"  ✗ Failed to download after {result.attempts} attempts: {result.error}")
+            failed.append({'url': img_url, 'alt': img.get('alt', ''),
+                           'attempts': result.attempts, 'error': result.error})
+            continue
+
+        content_type, content = result.value
+
+        # Determine file extension
+        if 'image/jpeg' in content_type or 'image/jpg' in content_type:
+            ext = '.jpg'
+        elif 'image/png' in content_type:
+            ext = '.png'
+        elif 'image/gif' in content_type:
+            ext = '.gif'
+        elif 'image/webp' in content_type:
+            ext = '.webp'
+        elif 'image/svg' in content_type:
+            ext = '.svg'
+        else:
+            # Try to get from URL
+            ext = Path(urlparse(img_url).path).suffix or '.jpg'
+
+        # Generate filename
+        base_name = get_meaningful_filename(img, img_url, idx)
+        filename = f"{base_name}{ext}"
+
+        # Handle duplicates
+        output_file = output_path / filename
+        counter = 1
+        while output_file.exists() and not journal.owns(filename, img_url):
+            filename = f"{base_name}_{counter}{ext}"
             output_file = output_path / filename
-            counter = 1
-            while output_file.exists():
-                filename = f"{base_name}_{counter}{ext}"
-                output_file = output_path / filename
-                counter += 1
-
-            # Verify filename has no spaces
-            if ' ' in filename or '\u202f' in filename or '\u00a0' in filename:
-                print(f"  WARNING: Filename contains spaces, sanitizing: {filename}")
-                filename = sanitize_filename(filename)
-                output_file = output_path / filename
-
-            # Save image
-            output_file.write_bytes(img_response.content)
-
-            print(f"  ✓ Downloaded: {filename} ({len(img_response.content)} bytes)")
-
-            downloaded.append(filename)
-            manifest.append({
-                'filename': filename,
-                'original_url': img_url,
-                'alt_text': img.get('alt', ''),
-                'size_bytes': len(img_response.content)
-            })
-
-        except Exception as e:
-            print(f"  ✗ Failed to download: {e}")
+            counter += 1
+
+        # Verify filename has no spaces
+        if ' ' in filename or '\u202f' in filename or '\u00a0' in filename:
+            print(f"  WARNING: Filename contains spaces, sanitizing: {filename}")
+            filename = sanitize_filename(filename)
+            output_file = output_path / filename
+
+        # Save image through the shared asset store
+        blob_store.save_bytes(content, output_file, url=result.job['fetch_url'], content_type=content_type)
+        journal.record(output_file, img_url)
+
+        print(f"  ✓ Downloaded: {filename} ({len(content)} bytes)")
+
+        downloaded.append(filename)
+        manifest.append({
+            'filename': filename,
+            'original_url': img_url,
+            'alt_text': img.get('alt', ''),
+            'size_bytes': len(content)
+        })
 
     # Verify no spaces in filenames
     print("\n" + "="*50)
@@ -187,14 +207,14 @@ def download_images(url, output_dir):
     # Save manifest
     manifest_file = output_path / 'images.json'
     with open(manifest_file, 'w', encoding='utf-8') as f:
-        json.dump(manifest, f, indent=2, ensure_ascii=False)
+        json.dump({'images': manifest, 'failed': failed}, f, indent=2, ensure_ascii=False)
 
     print("\n" + "="*50)
     print(f"Summary:")
     print(f"  Total images found: {len(images)}")
     print(f"  Content images filtered: {len(content_images)}")
     print(f"  Successfully downloaded: {len(downloaded)}")
-    print(f"  Failed: {len(content_images) - len(downloaded)}")
+    print(f"  Failed: {len(failed)}")
     print(f"  Output directory: {output_path.absolute()}")
     print(f"  Manifest file: {manifest_file.absolute()}")
 
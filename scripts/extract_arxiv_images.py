@@ -4,83 +4,39 @@ Script to download and extract images from arXiv papers.
 """
 
 import os
+import sys
 import json
-import requests
 from pathlib import Path
-import fitz  # PyMuPDF
-from PIL import Image
-import io
-
-def download_pdf(arxiv_id, output_path):
-    """Download PDF from arXiv."""
-    url = f"https://arxiv.org/pdf/{arxiv_id}.pdf"
-    print(f"Downloading PDF from {url}...")
-
-    response = requests.get(url, headers={
-        'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36'
-    })
-    response.raise_for_status()
-
-    with open(output_path, 'wb') as f:
-        f.write(response.content)
-
-    print(f"PDF downloaded to {output_path}")
-    return output_path
-
-def extract_images_from_pdf(pdf_path, output_dir):
-    """Extract all images from a PDF file."""
+from pdf_fetch import pdf_source
+from pdf_images import extract_images
+from pdf_figures import render_figures
+
+def pdf_url(arxiv_id):
+    """Return the PDF URL of an arXiv paper."""
+    return f"https://arxiv.org/pdf/{arxiv_id}.pdf"
+
+def extract_images_from_pdf(source, output_dir, mode='images'):
+    """
+    Extract figures from a PDF (in-memory buffer or file path).
+
+    mode 'images' extracts the embedded raster images; mode 'figures'
+    renders the region above every "Figure N:" caption, which also captures
+    vector drawings that page.get_images never returns.
+    """
     output_dir = Path(output_dir)
     output_dir.mkdir(parents=True, exist_ok=True)
 
-    doc = fitz.open(pdf_path)
-    images_info = []
-    image_count = 0
-
-    print(f"Processing {len(doc)} pages...")
-
-    for page_num in range(len(doc)):
-        page = doc[page_num]
-        image_list = page.get_images(full=True)
-
-        print(f"Page {page_num + 1}: Found {len(image_list)} images")
+    if mode == 'figures':
+        # Caption regions are rendered in parallel across pages
+        page_count, images_info = render_figures(source, output_dir)
+    else:
+        # Each xref is extracted once, in parallel across page ranges
+        page_count, images_info = extract_images(source, output_dir)
+    image_count = len(images_info)
 
-        for img_index, img in enumerate(image_list):
-            xref = img[0]
-
-            # Extract image bytes
-            base_image = doc.extract_image(xref)
-            image_bytes = base_image["image"]
-            image_ext = base_image["ext"]
-
-            # Generate filename
-            image_count += 1
-            filename = f"figure_{image_count:03d}.{image_ext}"
-            filepath = output_dir / filename
-
-            # Save image
-            with open(filepath, "wb") as img_file:
-                img_file.write(image_bytes)
-
-            # Try to get image dimensions
-            try:
-                with Image.open(io.BytesIO(image_bytes)) as pil_img:
-                    width, height = pil_img.size
-            except:
-                width, height = None, None
-
-            # Store metadata
-            images_info.append({
-                "filename": filename,
-                "page": page_num + 1,
-                "format": image_ext,
-                "width": width,
-                "height": height,
-                "size_bytes": len(image_bytes)
-            })
-
-            print(f"  Saved: {filename} ({image_ext}, {len(image_bytes)} bytes)")
-
-    doc.close()
+    print(f"Processed {page_count} pages")
+    for info in images_info:
+        print(f"  Page {info['page']}: saved {info['filename']} ({info['format']}, {info['size_bytes']} bytes)")
 
     # Save manifest
     manifest_path = output_dir / "images.json"
@@ -99,13 +55,15 @@ def extract_images_from_pdf(pdf_path, output_dir):
 def main():
     arxiv_id = "2306.02572"
     output_dir = Path("/Users/limo/Documents/GithubRepo/ccblog/blog/latent-variable-ebm")
-    pdf_path = output_dir / f"{arxiv_id}.pdf"
+    # 'images' (embedded rasters) or 'figures' (render each captioned figure)
+    mode = sys.argv[1] if len(sys.argv) > 1 else 'images'
 
-    # Download PDF
-    download_pdf(arxiv_id, pdf_path)
-
-    # Extract images
-    image_count, images_info = extract_images_from_pdf(pdf_path, output_dir)
+    # Download PDF (kept in memory, never written to the post directory)
+    url = pdf_url(arxiv_id)
+    print(f"Downloading PDF from {url}...")
+    with pdf_source(url) as source:
+        # Extract images
+        image_count, images_info = extract_images_from_pdf(source, output_dir, mode)
 
     print(f"\n{'='*60}")
     print(f"SUMMARY")
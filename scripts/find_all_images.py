@@ -1,17 +1,16 @@
 #!/usr/bin/env python3
-import requests
-from bs4 import BeautifulSoup
+import page_cache
+from html_parser import make_soup
 import re
 
 url = "https://thinkingmachines.ai/blog/defeating-nondeterminism-in-llm-inference/"
 
-session = requests.Session()
-session.headers.update({
+headers = {
     'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-})
+}
 
-response = session.get(url, timeout=30)
-soup = BeautifulSoup(response.content, 'html.parser')
+response = page_cache.fetch(url, headers=headers, timeout=30)
+soup = make_soup(response.content)
 
 # Find all elements with image-like URLs
 image_extensions = ['.jpg', '.jpeg', '.png', '.gif', '.webp', '.svg']
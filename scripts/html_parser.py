@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Shared BeautifulSoup constructor with a fast parser backend.
+
+Every scraper used BeautifulSoup(..., 'html.parser'), the pure-Python
+backend, which takes seconds on large pages such as saved Notion exports.
+make_soup uses the C-backed lxml parser when it is installed and falls back
+to html.parser otherwise. Set CCBLOG_HTML_PARSER=html.parser to force the old
+backend, e.g. to compare output on a page with badly broken markup, where the
+two parsers may repair the tree differently.
+
+make_content_soup goes further for the image scrapers: only the article
+subtrees are materialised, so navigation, footers, inline scripts and JSON
+blobs are tokenized but never turned into Tag objects.
+"""
+import os
+from bs4 import BeautifulSoup, SoupStrainer
+from bs4.builder import builder_registry
+
+PARSER_ENV = 'CCBLOG_HTML_PARSER'
+# Fastest first; html.parser ships with Python and is always available
+PREFERRED_PARSERS = ('lxml', 'html.parser')
+# Elements that hold the post body on the sites we scrape
+CONTENT_TAGS = ('article', 'main', 'd-article')
+
+_default_parser = None
+
+
+def default_parser():
+    """Return the parser make_soup uses (the env override, else the fastest installed)."""
+    global _default_parser
+    if _default_parser is None:
+        override = os.environ.get(PARSER_ENV)
+        if override:
+            _default_parser = override
+        else:
+            _default_parser = next(name for name in PREFERRED_PARSERS if builder_registry.lookup(name))
+    return _default_parser
+
+
+def make_soup(markup, parser=None, **kwargs):
+    """Parse markup (str or bytes) into a BeautifulSoup tree with the default parser."""
+    return BeautifulSoup(markup, parser or default_parser(), **kwargs)
+
+
+def make_content_soup(markup, content_tags=CONTENT_TAGS, parser=None):
+    """
+    Parse only the content subtrees of a page (with everything inside them).
+
+    Falls back to a full parse when the page has none of content_tags, so
+    callers can keep their usual find() chain (and its last-resort selectors)
+    on the result.
+    """
+    parser = parser or default_parser()
+    # html5lib ignores parse_only, so only the other builders get a strainer
+    if parser != 'html5lib':
+        soup = BeautifulSoup(markup, parser, parse_only=SoupStrainer(list(content_tags)))
+        if soup.find(True) is not None:
+            return soup
+    return BeautifulSoup(markup, parser)
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Shared pooled HTTP client for all scrapers.
+
+A single requests.Session is shared by every script (and every download
+thread), so figures fetched from the same host reuse keep-alive connections
+instead of paying a fresh TCP+TLS handshake each time.
+"""
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from rate_limit import RetryAfterTooLong, limiter
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept-Language': 'en-US,en;q=0.5',
+}
+DEFAULT_TIMEOUT = 30
+
+# Number of distinct hosts whose connection pools are cached
+POOL_CONNECTIONS = 32
+# Keep-alive connections kept per host; must cover download_engine.PER_HOST_LIMIT
+DEFAULT_POOL_SIZE = 8
+# Hosts we pull many small figures from get larger pools
+HOST_POOL_SIZES = {
+    'arxiv.org': 16,
+    'www.notion.so': 16,
+    'huggingface.co': 16,
+}
+
+_session = None
+_lock = threading.Lock()
+
+
+def _build_session(pool_sizes, headers):
+    session = requests.Session()
+    session.headers.update(DEFAULT_HEADERS)
+    if headers:
+        session.headers.update(headers)
+
+    default_adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=DEFAULT_POOL_SIZE)
+    session.mount('https://', default_adapter)
+    session.mount('http://', default_adapter)
+
+    # requests picks the adapter with the longest matching URL prefix
+    for host, size in pool_sizes.items():
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=size)
+        session.mount(f'https://{host}/', adapter)
+        session.mount(f'http://{host}/', adapter)
+
+    return session
+
+
+def configure(pool_sizes=None, headers=None):
+    """
+    Rebuild the shared session.
+
+    Args:
+        pool_sizes: Mapping of host -> keep-alive pool size (merged over HOST_POOL_SIZES)
+        headers: Extra default headers sent with every request
+    """
+    global _session
+    sizes = dict(HOST_POOL_SIZES)
+    sizes.update(pool_sizes or {})
+    with _lock:
+        if _session is not None:
+            _session.close()
+        _session = _build_session(sizes, headers)
+    return _session
+
+
+def get_session():
+    """Return the process-wide pooled session, creating it on first use."""
+    global _session
+    if _session is None:
+        with _lock:
+            if _session is None:
+                _session = _build_session(HOST_POOL_SIZES, None)
+    return _session
+
+
+def get(url, **kwargs):
+    """
+    GET through the shared session (per-call headers are merged over the defaults).
+
+    Requests are paced by the adaptive per-host limiter in rate_limit, which
+    also learns from the response status and any Retry-After header; a
+    Retry-After beyond rate_limit.MAX_RETRY_AFTER raises RetryAfterTooLong.
+    """
+    kwargs.setdefault('timeout', DEFAULT_TIMEOUT)
+    limiter.acquire(url)
+    try:
+        response = get_session().get(url, **kwargs)
+    except requests.RequestException:
+        limiter.failed(url)
+        raise
+    try:
+        limiter.feedback(url, response.status_code, response.headers.get('Retry-After'))
+    except RetryAfterTooLong:
+        response.close()
+        raise
+    return response
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Perceptual hashes for spotting the same figure at different sizes or encodings.
+
+srcset variants, Notion width variants and repeated PDF xrefs are the same
+picture with different bytes and URLs, so neither URL sets nor the SHA-256
+blob store can tell they are duplicates. A difference hash (dHash) can: the
+image is reduced to a (HASH_SIZE x HASH_SIZE+1) grayscale thumbnail and each
+bit records whether a pixel is brighter than its right-hand neighbour.
+Resizing and recompression barely change those bits, so two images are
+treated as candidates when their hashes differ in at most MAX_DISTANCE
+bits and their aspect ratios agree. 64 bits can still collide for charts
+drawn from the same template, so a candidate only counts as the same
+figure once the RMSE between (THUMB_SIZE x THUMB_SIZE) grayscale
+thumbnails of the two images is at most MAX_RMSE.
+
+Distances are computed with NumPy for a whole batch at once, and HashIndex
+keeps the hashes of optimized blobs so a figure already processed for
+another post is reused instead of being optimized again.
+"""
+import json
+import threading
+import numpy as np
+from PIL import Image
+import blob_store
+
+HASH_SIZE = 8
+# Differing bits (out of HASH_SIZE**2) still considered the same picture
+MAX_DISTANCE = 5
+# Largest relative difference in aspect ratio between duplicates
+MAX_ASPECT_DIFF = 0.02
+# Side of the grayscale thumbnails compared to confirm a hash match
+THUMB_SIZE = 32
+# Largest RMSE (in gray levels, 0-255) between the thumbnails of duplicates
+MAX_RMSE = 8
+# Append-only JSON Lines: {"sha256", "dhash", "width", "height", "optimized_width"}
+HASH_INDEX = blob_store.STORE_DIR / 'dhash.jsonl'
+
+_BIT_WEIGHTS = np.left_shift(np.uint64(1), np.arange(HASH_SIZE * HASH_SIZE, dtype=np.uint64))
+
+
+def dhash_thumbnails(thumbs):
+    """Hash a (N, HASH_SIZE, HASH_SIZE+1) uint8 stack; returns a uint64 array."""
+    thumbs = np.asarray(thumbs, dtype=np.int16)
+    bits = (thumbs[:, :, 1:] > thumbs[:, :, :-1]).reshape(len(thumbs), -1)
+    return (bits.astype(np.uint64) * _BIT_WEIGHTS).sum(axis=1, dtype=np.uint64)
+
+
+def image_dhash(path):
+    """
+    Return (dhash, width, height, thumb) for an image file, or None if it cannot be read.
+
+    thumb is the image's (THUMB_SIZE x THUMB_SIZE) grayscale thumbnail, for
+    same_picture().
+    """
+    try:
+        with Image.open(path) as img:
+            width, height = img.size
+            gray = img.convert('L')
+            hash_thumb = gray.resize((HASH_SIZE + 1, HASH_SIZE), Image.LANCZOS)
+            thumb = np.asarray(gray.resize((THUMB_SIZE, THUMB_SIZE), Image.BOX))
+    except Exception:
+        return None
+    return int(dhash_thumbnails([np.asarray(hash_thumb)])[0]), width, height, thumb
+
+
+def same_picture(thumb, other, max_rmse=MAX_RMSE):
+    """True if two image_dhash() thumbnails are close enough to be the same figure."""
+    diff = np.asarray(thumb, dtype=np.float32) - np.asarray(other, dtype=np.float32)
+    return float(np.sqrt(np.mean(diff * diff))) <= max_rmse
+
+
+def hamming(hashes, other):
+    """Bit distances between every hash in hashes (uint64 array) and other (array or int)."""
+    diff = np.bitwise_xor(np.asarray(hashes, dtype=np.uint64), np.asarray(other, dtype=np.uint64))
+    return np.unpackbits(diff[..., None].view(np.uint8), axis=-1).sum(axis=-1)
+
+
+def _same_shape(width, height, other_width, other_height):
+    ratio, other = width / height, other_width / other_height
+    return abs(ratio - other) <= MAX_ASPECT_DIFF * max(ratio, other)
+
+
+def group_duplicates(items, max_distance=MAX_DISTANCE):
+    """
+    Group near-identical images.
+
+    Args:
+        items: [(dhash, width, height, thumb)] as returned by image_dhash
+
+    Returns:
+        Lists of item indices, one per group of two or more duplicates, each
+        starting with the member with the most pixels (the copy to keep);
+        images with a zero hash (no detail to compare) are never grouped, and
+        hash matches whose thumbnails differ are not duplicates
+    """
+    if len(items) < 2:
+        return []
+    hashes = np.array([item[0] for item in items], dtype=np.uint64)
+    close = hamming(hashes[:, None], hashes[None, :]) <= max_distance
+    # A zero hash means no horizontal detail at all (blank or flat images)
+    close &= (hashes != 0)[:, None] & (hashes != 0)[None, :]
+
+    parent = list(range(len(items)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for i, j in zip(*np.nonzero(np.triu(close, k=1))):
+        if _same_shape(*items[i][1:3], *items[j][1:3]) and same_picture(items[i][3], items[j][3]):
+            parent[find(i)] = find(j)
+
+    groups = {}
+    for i in range(len(items)):
+        groups.setdefault(find(i), []).append(i)
+    return [sorted(members, key=lambda i: (-items[i][1] * items[i][2], i))
+            for members in groups.values() if len(members) > 1]
+
+
+class HashIndex:
+    """dHashes of optimized blobs in the asset store, shared by every post."""
+
+    def __init__(self, path=HASH_INDEX):
+        self.path = path
+        self._lock = threading.Lock()
+        self._records = []
+        if path.exists():
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        self._records.append(json.loads(line))
+                    except ValueError:
+                        continue  # Torn write from an interrupted run
+        self._hashes = np.array([int(r['dhash'], 16) for r in self._records], dtype=np.uint64)
+
+    def find(self, dhash, width, height, thumb, optimized_width, max_distance=MAX_DISTANCE):
+        """
+        Return the record of a stored copy of this picture, or None.
+
+        Only copies optimized for the same width from a source at least as
+        large as (width, height) qualify, so a thumbnail never stands in for
+        a full-size figure. Each hash match is confirmed against the stored
+        blob's own thumbnail before it is returned, and a blob whose bytes no
+        longer match its digest is never handed out.
+        """
+        if not len(self._hashes) or not dhash:
+            return None
+        for i in np.flatnonzero(hamming(self._hashes, dhash) <= max_distance):
+            record = self._records[i]
+            if not (record['optimized_width'] == optimized_width and record['width'] >= width
+                    and _same_shape(width, height, record['width'], record['height'])
+                    and blob_store.intact(record['sha256'])):
+                continue
+            stored = image_dhash(blob_store.blob_path(record['sha256']))
+            if stored is not None and same_picture(thumb, stored[3]):
+                return record
+        return None
+
+    def add(self, digest, dhash, width, height, optimized_width, **extra):
+        """Remember that blob digest is the optimized copy of a (width x height) source."""
+        record = {'sha256': digest, 'dhash': f'{dhash:016x}', 'width': width, 'height': height,
+                  'optimized_width': optimized_width, **extra}
+        with self._lock:
+            self._records.append(record)
+            self._hashes = np.append(self._hashes, np.uint64(dhash))
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record) + '\n')
+        return record
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Find images in a page while it is still downloading.
+
+ImageTokenizer is an incremental html.parser tokenizer: it is fed decoded
+chunks straight from the response stream and reports each image candidate
+(img src/srcset, <picture> srcset, inline background-image URLs) as soon
+as its tag has been read. stream_page_images() wraps this in a generator that
+download_engine.download_all can consume directly, so figure downloads start
+long before a large page has finished arriving.
+"""
+import codecs
+import re
+from html.parser import HTMLParser
+from urllib.parse import urljoin
+import http_client
+from srcset import tag_source
+
+CHUNK_SIZE = 16 * 1024
+BACKGROUND_IMAGE_RE = re.compile(r'background-image:\s*url\(["\']?([^"\')]+)["\']?\)', re.I)
+
+
+class ImageTokenizer(HTMLParser):
+    """
+    Incremental tokenizer that collects image candidates.
+
+    Each candidate is a dict {'url', 'alt', 'tag'}; a URL is reported once.
+    Call drain() after every feed() to take the candidates found so far.
+    """
+
+    def __init__(self, base_url):
+        super().__init__(convert_charrefs=True)
+        self.base_url = base_url
+        self._found = []
+        self._seen = set()
+        self._picture_depth = 0
+
+    def _add(self, src, alt, tag):
+        if not src:
+            return
+        url = urljoin(self.base_url, src.strip())
+        if url.startswith('data:') or url in self._seen:
+            return
+        self._seen.add(url)
+        self._found.append({'url': url, 'alt': alt, 'tag': tag})
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == 'img':
+            self._add(tag_source(attrs), attrs.get('alt') or '', 'img')
+        elif tag == 'picture':
+            self._picture_depth += 1
+        elif tag == 'source' and self._picture_depth and attrs.get('srcset'):
+            self._add(tag_source(attrs), '', 'source')
+
+        style = attrs.get('style')
+        if style and 'background-image' in style:
+            match = BACKGROUND_IMAGE_RE.search(style)
+            if match:
+                self._add(match.group(1), 'background-image', tag)
+
+    def handle_endtag(self, tag):
+        if tag == 'picture' and self._picture_depth:
+            self._picture_depth -= 1
+
+    def drain(self):
+        """Return and forget the candidates found since the last drain()."""
+        found, self._found = self._found, []
+        return found
+
+
+def iter_images(chunks, base_url):
+    """Yield image candidates from an iterable of str chunks as they are parsed."""
+    parser = ImageTokenizer(base_url)
+    for chunk in chunks:
+        parser.feed(chunk)
+        yield from parser.drain()
+    parser.close()
+    yield from parser.drain()
+
+
+def stream_page_images(url, headers=None, timeout=30):
+    """
+    Fetch url and yield its image candidates while the body is still arriving.
+
+    The response is read in CHUNK_SIZE pieces and decoded incrementally with
+    the charset the server declared (UTF-8 if none).
+    """
+    response = http_client.get(url, headers=headers, timeout=timeout, stream=True)
+    response.raise_for_status()
+    decoder = codecs.getincrementaldecoder(response.encoding or 'utf-8')(errors='replace')
+
+    def chunks():
+        for raw in response.iter_content(chunk_size=CHUNK_SIZE):
+            yield decoder.decode(raw)
+        yield decoder.decode(b'', final=True)
+
+    try:
+        yield from iter_images(chunks(), url)
+    finally:
+        response.close()
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Single-pass HTML to Markdown conversion for scraped articles.
+
+The scrapers used to call find_all over a list of tag names and get_text on
+each match, so nested matches (code inside pre, p inside li) were visited and
+printed more than once. MarkdownWalker visits every node exactly once, in
+document order, and emits headings, paragraphs, nested lists, code fences,
+block quotes, GFM tables, links and images as it goes. Site adapters reuse it
+by passing their own skip predicate and base URL.
+"""
+import re
+from urllib.parse import urljoin
+from bs4 import Comment, NavigableString, Tag
+from bs4.element import Declaration, Doctype, ProcessingInstruction
+
+# Never part of article content
+SKIP_TAGS = frozenset({
+    'script', 'style', 'noscript', 'template', 'nav', 'footer', 'form',
+    'button', 'svg', 'iframe', 'head', 'title', 'meta', 'link',
+})
+BLOCK_TAGS = frozenset({
+    'p', 'div', 'section', 'article', 'main', 'header', 'aside', 'figure',
+    'figcaption', 'details', 'summary', 'dl', 'dt', 'dd', 'tr',
+    'hr', 'body', 'html',
+})
+HEADINGS = {'h1': 1, 'h2': 2, 'h3': 3, 'h4': 4, 'h5': 5, 'h6': 6}
+_SKIPPED_STRINGS = (Comment, Declaration, Doctype, ProcessingInstruction)
+
+_WS_RE = re.compile(r'\s+')
+_BLANK_LINES_RE = re.compile(r'\n(?:[ \t]*\n)+')
+_LANG_RE = re.compile(r'^(?:language|lang|highlight)-(\S+)$')
+_CODE_LINE_RE = re.compile(r'\x00(\d+)\x00')
+
+
+def _block(text):
+    text = text.strip()
+    return f'\n\n{text}\n\n' if text else ''
+
+
+class MarkdownWalker:
+    """
+    Convert an HTML subtree to Markdown in one linear walk.
+
+    Args:
+        base_url: Used to make image and link URLs absolute
+        skip: Optional predicate; a Tag for which it returns True is dropped
+            together with its subtree
+        skip_tags: Tag names that are always dropped
+        image_url: Optional function applied to each absolute image URL
+            (e.g. cdn_rewrite.rewrite)
+
+    After walk(), images holds one {'src', 'alt'} dict per image, in
+    document order.
+    """
+
+    def __init__(self, base_url=None, skip=None, skip_tags=SKIP_TAGS, image_url=None):
+        self.base_url = base_url
+        self.skip = skip
+        self.skip_tags = skip_tags
+        self.image_url = image_url
+        self.images = []
+        self._code_lines = []
+
+    def walk(self, root):
+        """Return the Markdown for root (a Tag or BeautifulSoup object)."""
+        self.images = []
+        self._code_lines = []
+        text = _BLANK_LINES_RE.sub('\n\n', self._render(root)).strip()
+        # Code lines are kept out of whitespace normalisation until the end
+        return _CODE_LINE_RE.sub(lambda m: self._code_lines[int(m.group(1))], text)
+
+    def _url(self, url):
+        return urljoin(self.base_url, url) if self.base_url else url
+
+    def _children(self, node):
+        return ''.join(self._render(child) for child in node.children)
+
+    def _render(self, node):
+        if isinstance(node, NavigableString):
+            if isinstance(node, _SKIPPED_STRINGS):
+                return ''
+            return _WS_RE.sub(' ', str(node))
+        if not isinstance(node, Tag):
+            return ''
+
+        name = node.name
+        if name in self.skip_tags or (self.skip and self.skip(node)):
+            return ''
+
+        if name in HEADINGS:
+            text = _WS_RE.sub(' ', self._children(node)).strip()
+            return _block(f"{'#' * HEADINGS[name]} {text}") if text else ''
+        if name == 'pre':
+            return self._pre(node)
+        if name == 'code':
+            text = node.get_text()
+            return f'`{text}`' if text.strip() else ''
+        if name in ('ul', 'ol'):
+            return self._list(node)
+        if name == 'blockquote':
+            inner = _BLANK_LINES_RE.sub('\n\n', self._children(node)).strip()
+            return _block('\n'.join(f'> {line}'.rstrip() for line in inner.split('\n')))
+        if name == 'img':
+            return self._img(node)
+        if name == 'br':
+            return '\n'
+        if name == 'hr':
+            return _block('---')
+        if name == 'a':
+            text = self._children(node).strip()
+            href = node.get('href')
+            if text and href and not href.startswith(('#', 'javascript:')):
+                return f'[{text}]({self._url(href)})'
+            return text
+        if name in ('strong', 'b'):
+            text = self._children(node).strip()
+            return f'**{text}**' if text else ''
+        if name in ('em', 'i'):
+            text = self._children(node).strip()
+            return f'*{text}*' if text else ''
+        if name == 'table':
+            return self._table(node)
+        if name in BLOCK_TAGS:
+            return _block(self._children(node))
+        return self._children(node)
+
+    def _pre(self, node):
+        code = node.find('code')
+        language = ''
+        for tag in (node, code):
+            for cls in (tag.get('class') or []) if tag else []:
+                match = _LANG_RE.match(cls)
+                if match:
+                    language = match.group(1)
+                    break
+            if language:
+                break
+        # Every code line becomes its own placeholder line, so list indentation
+        # and quote prefixes apply to each line while the code itself (blank
+        # lines included) is left untouched
+        lines = []
+        for line in node.get_text().strip('\n').split('\n'):
+            self._code_lines.append(line)
+            lines.append(f'\x00{len(self._code_lines) - 1}\x00')
+        return _block('\n'.join([f'```{language}', *lines, '```']))
+
+    def _cell(self, cell):
+        text = _WS_RE.sub(' ', self._children(cell)).strip()
+        return text.replace('|', '\\|')
+
+    def _table(self, node):
+        """Emit a GFM table; the first row is the header (GFM requires one)."""
+        rows = []
+        for tr in node.find_all('tr'):
+            if tr.find_parent('table') is not node or (self.skip and self.skip(tr)):
+                continue
+            cells = [self._cell(cell) for cell in tr.find_all(['td', 'th'], recursive=False)]
+            if cells:
+                rows.append(cells)
+        if not rows:
+            return ''
+        width = max(len(row) for row in rows)
+        rows = [row + [''] * (width - len(row)) for row in rows]
+        lines = ['| ' + ' | '.join(row) + ' |' for row in rows]
+        lines.insert(1, '|' + ' --- |' * width)
+        return _block('\n'.join(lines))
+
+    def _list(self, node):
+        ordered = node.name == 'ol'
+        lines = []
+        number = 1
+        for item in node.find_all('li', recursive=False):
+            if self.skip and self.skip(item):
+                continue
+            body = _BLANK_LINES_RE.sub('\n', self._children(item)).strip()
+            if not body:
+                continue
+            marker = f'{number}. ' if ordered else '- '
+            number += 1
+            first, *rest = body.split('\n')
+            lines.append(marker + first.strip())
+            # Nested lists and continuation lines are indented under the marker
+            lines.extend(' ' * len(marker) + line if line.strip() else '' for line in rest)
+        return _block('\n'.join(lines))
+
+    def _img(self, node):
+        src = node.get('src') or node.get('data-src')
+        if not src or src.startswith('data:'):
+            return ''
+        src = self._url(src)
+        if self.image_url:
+            src = self.image_url(src)
+        alt = _WS_RE.sub(' ', node.get('alt', '')).strip()
+        self.images.append({'src': src, 'alt': alt})
+        return f'![{alt}]({src})'
+
+
+def to_markdown(root, base_url=None, skip=None, image_url=None):
+    """Convenience wrapper: the Markdown for root in one pass."""
+    return MarkdownWalker(base_url=base_url, skip=skip, image_url=image_url).walk(root)
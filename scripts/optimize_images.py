@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+"""
+Post-download optimization stage: resize and recompress figures for WeChat.
+
+Usage: optimize_images.py POST_DIR [POST_DIR ...]
+
+Every raster image listed in a post's images.json is scaled down to
+MAX_WIDTH and re-encoded as PNG (diagrams, screenshots, anything with
+transparency) or JPEG (photographs), stepping down quality and then size
+until it fits MAX_BYTES. Images are processed in a process pool.
+
+Files in a post directory are usually hardlinks into the blob store, and
+optimized results are linked back into it, so this stage never writes
+through an existing name: the result is written to a temp file and moved
+over the old name with os.replace, which leaves the stored blob untouched.
+The extractors that write into post directories (pdf_images, pdf_figures)
+go through blob_store the same way; see blob_store for the rule.
+images.json records the size before and after, and is itself replaced
+atomically. Near-duplicate figures are collapsed by perceptual hash
+before anything is optimized, so only one copy is kept and processed.
+"""
+import json
+import os
+import re
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from itertools import repeat
+from pathlib import Path
+from PIL import Image
+import blob_store
+from srcset import TARGET_WIDTH
+from image_hash import HashIndex, group_duplicates, image_dhash
+
+# Widest image WeChat articles display at full resolution (srcset selection
+# and CDN rewrites request the same width)
+MAX_WIDTH = TARGET_WIDTH
+# Per-image byte budget
+MAX_BYTES = 1024 * 1024
+# JPEG qualities tried in order until the budget is met
+JPEG_QUALITIES = (88, 82, 75, 68, 60)
+# Each further attempt shrinks the image by this factor
+SHRINK_STEP = 0.85
+# A downscaled copy with at most this many colours is a diagram, not a photo
+MAX_DIAGRAM_COLORS = 256
+
+RASTER_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.webp', '.bmp', '.gif', '.tif', '.tiff')
+MANIFEST_NAME = 'images.json'
+
+
+def manifest_entries(manifest):
+    """
+    Return the list of image entries of an images.json, or None if the shape is unknown.
+
+    Handles a bare list, {'images': [...]} and download_arxiv_images'
+    {'successful': [...], 'skipped': [...], 'failed': [...]} (only the
+    successful entries carry filenames to optimize).
+    """
+    if isinstance(manifest, list):
+        return manifest
+    if isinstance(manifest, dict):
+        for key in ('images', 'successful'):
+            if isinstance(manifest.get(key), list):
+                return manifest[key]
+    return None
+
+
+def _has_alpha(img):
+    if img.mode in ('RGBA', 'LA') or (img.mode == 'P' and 'transparency' in img.info):
+        return img.convert('RGBA').getchannel('A').getextrema()[0] < 255
+    return False
+
+
+def choose_format(img):
+    """'PNG' for diagrams and transparent images, 'JPEG' for photographs."""
+    if _has_alpha(img):
+        return 'PNG'
+    # Nearest-neighbour sampling, so anti-aliasing does not invent colours
+    sample = img.convert('RGB').resize((min(img.width, 128), min(img.height, 128)), Image.NEAREST)
+    return 'PNG' if sample.getcolors(MAX_DIAGRAM_COLORS) is not None else 'JPEG'
+
+
+def _encode(img, fmt, quality):
+    buf = BytesIO()
+    if fmt == 'JPEG':
+        img.convert('RGB').save(buf, 'JPEG', quality=quality, optimize=True, progressive=True)
+    elif quality is None:
+        img.save(buf, 'PNG', optimize=True)
+    else:
+        # Lossy PNG: reduce to a 256-colour palette
+        img.quantize(256, dither=Image.Dither.FLOYDSTEINBERG).save(buf, 'PNG', optimize=True)
+    return buf.getvalue()
+
+
+def _resize(img, width):
+    height = max(1, round(img.height * width / img.width))
+    return img.resize((width, height), Image.LANCZOS)
+
+
+def encode_to_budget(img, fmt, max_bytes=MAX_BYTES):
+    """Encode img as fmt, lossless first, then lossy, then smaller, until it fits max_bytes."""
+    qualities = JPEG_QUALITIES if fmt == 'JPEG' else (None, 'palette')
+    while True:
+        for quality in qualities:
+            data = _encode(img, fmt, quality)
+            if len(data) <= max_bytes:
+                return img, data
+        if img.width <= 1:
+            return img, data
+        img = _resize(img, max(1, int(img.width * SHRINK_STEP)))
+
+
+def optimize_file(path, max_width=MAX_WIDTH, max_bytes=MAX_BYTES):
+    """
+    Optimize one image file; returns a result dict (see optimize_post).
+
+    The new file may get a different extension (e.g. a photographic PNG
+    becomes .jpg); the old name is then removed.
+    """
+    path = Path(path)
+    original_bytes = path.stat().st_size
+    result = {'filename': path.name, 'original_bytes': original_bytes, 'bytes': original_bytes}
+    try:
+        with Image.open(path) as img:
+            if getattr(img, 'is_animated', False):
+                result['skipped'] = 'animated'
+                return result
+            img.load()
+            if img.mode not in ('RGB', 'RGBA', 'L', 'LA', 'P'):
+                img = img.convert('RGB')
+    except Exception as e:
+        result['skipped'] = f"unreadable: {e}"
+        return result
+
+    fmt = choose_format(img)
+    resized = img.width > max_width
+    if resized:
+        img = _resize(img, max_width)
+    img, data = encode_to_budget(img, fmt, max_bytes)
+
+    # Nothing gained: keep the original bytes
+    if not resized and len(data) >= original_bytes and original_bytes <= max_bytes:
+        result.update(width=img.width, height=img.height, format=fmt)
+        return result
+
+    ext = '.jpg' if fmt == 'JPEG' else '.png'
+    target = path if path.suffix.lower() in (('.jpg', '.jpeg') if fmt == 'JPEG' else ('.png',)) \
+        else path.with_suffix(ext)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix='.tmp-', suffix=ext)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.chmod(tmp_path, path.stat().st_mode & 0o777)
+        # Replaces the directory entry only; a hardlinked blob keeps its bytes
+        os.replace(tmp_path, target)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    if target != path:
+        path.unlink()
+
+    result.update(filename=target.name, bytes=len(data), width=img.width, height=img.height, format=fmt)
+    return result
+
+
+def _write_json(path, data):
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix='.tmp-', suffix='.json')
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+    if path.exists():
+        os.chmod(tmp_path, path.stat().st_mode & 0o777)
+    os.replace(tmp_path, path)
+
+
+def _rename_references(post_dir, renames):
+    """Point Markdown files in post_dir at renamed images."""
+    for md_file in post_dir.glob('*.md'):
+        content = md_file.read_text(encoding='utf-8')
+        updated = content
+        for old, new in renames.items():
+            # Whole link targets only: renaming 1.png must not touch 11.png
+            updated = re.sub(rf'(?<=[(/]){re.escape(old)}(?=\))', lambda _: new, updated)
+        if updated != content:
+            md_file.write_text(updated, encoding='utf-8')
+
+
+def _apply(entry, result, max_width, renames):
+    """Copy an optimize_file result into a manifest entry."""
+    if result['filename'] != entry['filename']:
+        renames[entry['filename']] = result['filename']
+        entry['filename'] = result['filename']
+    entry['original_size_bytes'] = entry.get('original_size_bytes', result['original_bytes'])
+    entry['size_bytes'] = result['bytes']
+    if 'size' in entry:
+        entry['size'] = result['bytes']
+    entry['optimized_width'] = max_width
+    if 'format' in entry:
+        entry['format'] = 'jpeg' if result['format'] == 'JPEG' else 'png'
+    if 'width' in entry:
+        entry['width'], entry['height'] = result['width'], result['height']
+    if 'dimensions' in entry:
+        entry['dimensions'] = f"{result['width']}x{result['height']}"
+    if 'reused_blob' in result:
+        entry['reused_blob'] = result['reused_blob']
+
+
+def _drop_duplicates(todo, hashes, renames, stale):
+    """
+    Collapse near-identical copies within the post onto the largest one.
+
+    The dropped files are only added to stale, to be deleted once the
+    manifest and Markdown no longer refer to them. Returns the surviving
+    todo indices and the dropped ones.
+    """
+    hashed = [i for i, h in enumerate(hashes) if h is not None]
+    dropped = set()
+    for group in group_duplicates([hashes[i] for i in hashed]):
+        keep_entry, keep_path = todo[hashed[group[0]]]
+        for member in group[1:]:
+            entry, path = todo[hashed[member]]
+            dropped.add(hashed[member])
+            if path != keep_path:
+                stale.append(path)
+                renames[path.name] = keep_path.name
+            keep_entry.setdefault('duplicates', []).append(entry.get('original_url') or path.name)
+            print(f"  {path.name}: duplicate of {keep_path.name}, removed")
+    return [i for i in range(len(todo)) if i not in dropped], dropped
+
+
+def _reuse_stored(path, record, stale):
+    """
+    Link an optimized copy from another post next to path; returns the result dict.
+
+    The result names the reused blob for the manifest; a source left behind
+    under another extension goes to stale rather than being deleted here.
+    """
+    target = path.with_suffix(record['ext'])
+    original_bytes = path.stat().st_size
+    blob_store.link(record['sha256'], target)
+    if target != path:
+        stale.append(path)
+    return {'filename': target.name, 'original_bytes': original_bytes, 'bytes': target.stat().st_size,
+            'width': record['out_width'], 'height': record['out_height'], 'format': record['format'],
+            'reused_blob': record['sha256']}
+
+
+def optimize_post(post_dir, max_width=MAX_WIDTH, max_bytes=MAX_BYTES, workers=None, index=None):
+    """
+    Optimize the images listed in post_dir/images.json and update the manifest.
+
+    Near-identical figures (see image_hash) are collapsed first: the copy
+    with the most pixels is kept, the others are deleted, their entries
+    removed from the manifest and recorded under the kept entry's
+    'duplicates'. A figure already optimized for another post is linked
+    from the blob store instead of being processed again (its digest is
+    recorded as 'reused_blob'), and every newly optimized file is added to
+    the store and its hash index. Replaced files are only deleted after the
+    manifest has been written.
+
+    Each optimized entry gets 'original_size_bytes' and its 'size_bytes'
+    (plus 'filename', 'format', 'width'/'height' or 'dimensions' where the
+    manifest has them) updated. Entries already optimized for the same
+    max_width are skipped, so re-runs do not recompress twice.
+
+    Returns:
+        (bytes before, bytes after) over the images processed
+    """
+    post_dir = Path(post_dir)
+    manifest_path = post_dir / MANIFEST_NAME
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    entries = manifest_entries(manifest)
+    if entries is None:
+        print(f"  Skipped {manifest_path}: no image list in a known manifest format")
+        return 0, 0
+
+    todo = []
+    for entry in entries:
+        path = post_dir / entry.get('filename', '')
+        if (path.suffix.lower() in RASTER_EXTENSIONS and path.is_file()
+                and entry.get('optimized_width') != max_width):
+            todo.append((entry, path))
+    if not todo:
+        return 0, 0
+
+    index = index or HashIndex()
+    paths = [str(path) for _, path in todo]
+    workers = min(workers or os.cpu_count() or 1, len(todo))
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    map_ = pool.map if pool else map
+    try:
+        hashes = list(map_(image_dhash, paths))
+
+        renames = {}
+        stale = []
+        keep, dropped = _drop_duplicates(todo, hashes, renames, stale)
+        if dropped:
+            dropped_entries = [id(todo[i][0]) for i in dropped]
+            entries[:] = [entry for entry in entries if id(entry) not in dropped_entries]
+
+        results = {}
+        pending = []
+        for i in keep:
+            entry, path = todo[i]
+            record = hashes[i] and index.find(*hashes[i], max_width)
+            if record:
+                results[i] = _reuse_stored(path, record, stale)
+                print(f"  {results[i]['filename']}: reused optimized copy from the asset store")
+            else:
+                pending.append(i)
+
+        optimized = map_(optimize_file, [paths[i] for i in pending], repeat(max_width), repeat(max_bytes))
+        for i, result in zip(pending, optimized):
+            results[i] = result
+            if 'skipped' in result:
+                continue
+            # Back into the store, so other posts can link this copy
+            target = post_dir / result['filename']
+            digest = blob_store.put_file(target)
+            blob_store.link(digest, target)
+            if hashes[i]:
+                index.add(digest, *hashes[i][:3], max_width, ext=target.suffix, format=result['format'],
+                          out_width=result['width'], out_height=result['height'])
+    finally:
+        if pool:
+            pool.shutdown()
+
+    before = after = 0
+    for i in keep:
+        entry, path = todo[i]
+        result = results[i]
+        if 'skipped' in result:
+            print(f"  Skipped {path.name}: {result['skipped']}")
+            continue
+        before += result['original_bytes']
+        after += result['bytes']
+        _apply(entry, result, max_width, renames)
+        print(f"  {result['filename']}: {result['original_bytes']} -> {result['bytes']} bytes")
+
+    if renames:
+        _rename_references(post_dir, renames)
+    _write_json(manifest_path, manifest)
+    for path in stale:
+        path.unlink(missing_ok=True)
+    return before, after
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(__doc__.strip())
+        sys.exit(1)
+
+    for post_dir in sys.argv[1:]:
+        print(f"Optimizing {post_dir}")
+        before, after = optimize_post(post_dir)
+        if before:
+            print(f"  Total: {before} -> {after} bytes ({100 * after / before:.0f}%)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+On-disk HTTP page cache shared by the page inspection scripts.
+
+Pages are stored under ~/.cache/ccblog/pages together with their ETag and
+Last-Modified validators. A page fetched within max_age seconds is served
+straight from disk; an older one is revalidated with a conditional GET, and a
+304 reply reuses the stored body. The cache is bounded in size and evicts the
+least recently used pages first.
+"""
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+import http_client
+
+CACHE_DIR = Path(os.environ.get('CCBLOG_CACHE_DIR', Path.home() / '.cache' / 'ccblog')) / 'pages'
+MAX_CACHE_BYTES = 256 * 1024 * 1024
+# Serve from disk without revalidating for this many seconds
+DEFAULT_MAX_AGE = 600
+
+# Response headers kept alongside the body
+_STORED_HEADERS = ('Content-Type', 'ETag', 'Last-Modified')
+
+
+class CachedPage:
+    """Minimal response object (content, text, status_code, headers, url)."""
+
+    def __init__(self, url, status_code, headers, content, from_cache):
+        self.url = url
+        self.status_code = status_code
+        self.headers = CaseInsensitiveDict(headers)
+        self.content = content
+        self.from_cache = from_cache
+
+    @property
+    def text(self):
+        # Same charset rules as requests.Response.text for a declared encoding
+        encoding = get_encoding_from_headers(self.headers) or 'utf-8'
+        return self.content.decode(encoding, errors='replace')
+
+
+def _paths(url):
+    key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+    return CACHE_DIR / f'{key}.json', CACHE_DIR / f'{key}.body'
+
+
+def _load(url):
+    meta_path, body_path = _paths(url)
+    try:
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get('url') != url or not body_path.exists():
+            return None
+        return meta
+    except (OSError, ValueError):
+        return None
+
+
+def _store(url, response):
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    meta_path, body_path = _paths(url)
+    meta = {
+        'url': url,
+        'status_code': response.status_code,
+        'headers': {k: response.headers[k] for k in _STORED_HEADERS if k in response.headers},
+        'fetched_at': time.time(),
+        'size': len(response.content),
+    }
+    tmp = body_path.with_suffix('.tmp')
+    tmp.write_bytes(response.content)
+    os.replace(tmp, body_path)
+    with open(meta_path, 'w', encoding='utf-8') as f:
+        json.dump(meta, f)
+    return meta
+
+
+def _hit(url, meta):
+    meta_path, body_path = _paths(url)
+    # The body's mtime doubles as the LRU timestamp
+    os.utime(body_path)
+    return CachedPage(url, meta['status_code'], meta['headers'], body_path.read_bytes(), True)
+
+
+def evict(max_bytes=MAX_CACHE_BYTES):
+    """Delete least recently used pages until the cache fits in max_bytes."""
+    if not CACHE_DIR.exists():
+        return
+    bodies = []
+    for body_path in CACHE_DIR.glob('*.body'):
+        try:
+            st = body_path.stat()
+        except OSError:
+            continue
+        bodies.append((st.st_mtime, st.st_size, body_path))
+    total = sum(size for _, size, _ in bodies)
+    for _, size, body_path in sorted(bodies):
+        if total <= max_bytes:
+            break
+        body_path.unlink(missing_ok=True)
+        body_path.with_suffix('.json').unlink(missing_ok=True)
+        total -= size
+
+
+def fetch(url, headers=None, max_age=DEFAULT_MAX_AGE, timeout=30):
+    """
+    Fetch url through the cache.
+
+    Args:
+        url: Page URL
+        headers: Extra request headers
+        max_age: Seconds a stored page is used without revalidation (0 = always revalidate)
+        timeout: Request timeout in seconds
+
+    Returns:
+        CachedPage; from_cache is True when the body came from disk
+    """
+    meta = _load(url)
+    request_headers = dict(headers or {})
+
+    if meta:
+        if time.time() - meta['fetched_at'] < max_age:
+            return _hit(url, meta)
+        if 'ETag' in meta['headers']:
+            request_headers['If-None-Match'] = meta['headers']['ETag']
+        if 'Last-Modified' in meta['headers']:
+            request_headers['If-Modified-Since'] = meta['headers']['Last-Modified']
+
+    response = http_client.get(url, headers=request_headers, timeout=timeout)
+
+    if response.status_code == 304 and meta:
+        meta['fetched_at'] = time.time()
+        with open(_paths(url)[0], 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        return _hit(url, meta)
+
+    if response.status_code == 200:
+        meta = _store(url, response)
+        evict()
+        return CachedPage(url, 200, meta['headers'], response.content, False)
+
+    return CachedPage(url, response.status_code, response.headers, response.content, False)
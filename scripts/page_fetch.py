@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Static-first page fetching with automatic fallback to a headless browser.
+
+Most of our sources serve their articles as plain HTML, so fetch_page()
+always tries a cheap static fetch (through page_cache) first. Only when a
+successful response looks like a client-rendered shell -- almost no text
+and no images in the content root (or in <body> when no root matches), or a
+framework bootstrap payload where the content root should be -- is the page
+loaded in the shared browser pool. Playwright is imported only on that path, so
+static-only runs never start Chromium or even need it installed.
+"""
+import sys
+import page_cache
+from html_parser import CONTENT_TAGS, make_soup
+
+# Inline payloads left by client-side frameworks, with a name for the logs
+SHELL_MARKERS = (
+    ('__NEXT_DATA__', 'Next.js'),
+    ('self.__next_f', 'Next.js'),
+    ('window.__NUXT__', 'Nuxt'),
+    ('id="notion-app"', 'Notion'),
+)
+# A content root with less visible text than this (and no images) is empty
+MIN_TEXT_CHARS = 500
+_INVISIBLE_TAGS = ('script', 'style', 'noscript', 'template')
+
+
+class FetchedPage:
+    """
+    A fetched page and how it was obtained.
+
+    Attributes:
+        url: Page URL
+        html: Page markup (the rendered DOM when rendered is True)
+        soup: Parsed tree of html
+        rendered: True if the page went through the browser
+        reason: Why the browser was needed ('' for static pages)
+    """
+
+    def __init__(self, url, html, soup, rendered=False, reason=''):
+        self.url = url
+        self.html = html
+        self.soup = soup
+        self.rendered = rendered
+        self.reason = reason
+
+
+def content_root(soup, adapter=None):
+    """The adapter's article root, else the first CONTENT_TAGS element; None if neither exists."""
+    selector = root_selector(adapter)
+    root = soup.select_one(selector) if selector else None
+    return root if root is not None else soup.find(list(CONTENT_TAGS))
+
+
+def shell_reason(soup, html, adapter=None):
+    """
+    Return why a statically fetched page looks client-rendered, or '' if it does not.
+
+    The content root is measured, or <body> for ordinary pages without one
+    (a div-based layout is not a shell). Only almost no text and no images
+    there counts, or a framework bootstrap payload on a page with no
+    content root at all; server-rendered pages that have an article but no
+    figures stay static.
+    """
+    root = content_root(soup, adapter)
+    markers = [name for marker, name in SHELL_MARKERS if marker in html]
+    shell = f" ({markers[0]} bootstrap)" if markers else ''
+
+    where = 'content root'
+    if root is None:
+        if markers:
+            return f"no content root{shell}"
+        root, where = soup.body or soup, 'body'
+    text = ' '.join(s for s in root.find_all(string=True) if s.parent.name not in _INVISIBLE_TAGS)
+    chars = len(' '.join(text.split()))
+    if chars < MIN_TEXT_CHARS and root.find('img') is None:
+        return f"empty {where}, {chars} characters of text{shell}"
+    return ''
+
+
+def root_selector(adapter):
+    """CSS selector list for the adapter's article root (None without an adapter)."""
+    if adapter is None:
+        return None
+    selectors = [s for s in adapter.selectors if s != 'body']
+    return ', '.join(selectors) or None
+
+
+def render(url, pool=None, block_profile='content', selector=None, scroll_selector=None):
+    """Load url in the browser pool and return the DOM once its images have loaded."""
+    # Imported here so static-only runs do not need Playwright
+    from browser_pool import block_resources, get_pool, wait_for_images
+
+    pool = pool or get_pool()
+    with pool.page() as page:
+        block_resources(page, block_profile, page_url=url)
+        page.goto(url, wait_until='domcontentloaded', timeout=60000)
+        wait_for_images(page, root_selector=selector, scroll_selector=scroll_selector)
+        return page.content()
+
+
+def fetch_page(url, adapter=None, headers=None, pool=None, force_browser=False, timeout=30):
+    """
+    Fetch url statically, escalating to the browser only for client-rendered shells.
+
+    Args:
+        url: Page URL
+        adapter: Optional SiteAdapter; supplies headers, the content root to
+            wait for and the request-blocking profile
+        headers: Extra request headers for the static fetch
+        pool: BrowserPool to use (the process-wide pool if None)
+        force_browser: Skip the static attempt (pages known to need a browser)
+        timeout: Static request timeout in seconds
+
+    Returns:
+        FetchedPage
+    """
+    if headers is None and adapter is not None:
+        headers = adapter.headers
+
+    selector = root_selector(adapter)
+    if force_browser:
+        reason = 'browser required by adapter'
+    else:
+        response = page_cache.fetch(url, headers=headers, timeout=timeout)
+        if not 200 <= response.status_code < 300:
+            # A missing or forbidden page is not a rendering problem
+            raise ValueError(f"HTTP {response.status_code} for {url}")
+        soup = make_soup(response.content)
+        reason = shell_reason(soup, response.text, adapter)
+        if not reason:
+            return FetchedPage(url, response.text, soup)
+        if selector and soup.select_one(selector) is None:
+            # Not in the static DOM, so possibly never: do not block on it
+            selector = None
+
+    print(f"  Rendering in browser: {reason}")
+    block_profile = adapter.block_profile if adapter is not None else 'content'
+    scroll_selector = adapter.scroll_selector if adapter is not None else None
+    html = render(url, pool=pool, block_profile=block_profile, selector=selector,
+                  scroll_selector=scroll_selector)
+    return FetchedPage(url, html, make_soup(html), rendered=True, reason=reason)
+
+
+def close_pool():
+    """Shut down the browser pool render() started, if any (before other event loops run)."""
+    # Only loaded if a page was rendered; static-only runs never import Playwright
+    browser_pool = sys.modules.get('browser_pool')
+    if browser_pool is not None:
+        browser_pool.close_pool()
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Stream a PDF over HTTP straight into PyMuPDF.
+
+The body is read in chunks through the shared http_client and handed to fitz
+as an in-memory buffer, so the PDF is never written to the post directory and
+then read back. Papers bigger than SPILL_BYTES are spilled to a temp file
+instead (removed once it is no longer needed), which MuPDF reads lazily, so
+a large scan never sits in memory twice.
+
+document_pool() runs page work in worker processes that each open the PDF
+from a file path, so an in-memory buffer is written to a temp file once
+rather than pickled into every worker.
+"""
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+import fitz  # PyMuPDF
+import http_client
+
+CHUNK_SIZE = 1 << 20
+# Bodies up to this size stay in memory; larger ones go to a temp file
+SPILL_BYTES = 64 * 1024 * 1024
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36'
+}
+
+
+def _spill(buf, chunks):
+    """Write buf plus the remaining chunks to a temp file; returns its path."""
+    fd, tmp_path = tempfile.mkstemp(suffix='.pdf')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(buf)
+            del buf[:]
+            for chunk in chunks:
+                f.write(chunk)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return tmp_path
+
+
+def fetch_pdf(url, headers=None, timeout=60, spill_bytes=SPILL_BYTES):
+    """
+    Stream a PDF body without opening it.
+
+    Args:
+        url: PDF URL (redirects are followed)
+        headers: Request headers (defaults to a desktop User-Agent)
+        timeout: Request timeout in seconds
+        spill_bytes: Size above which the body is spilled to a temp file
+
+    Returns:
+        A bytearray, or the path (str) of a temp file the caller must delete
+    """
+    response = http_client.get(url, headers=headers or DEFAULT_HEADERS, timeout=timeout, stream=True)
+    response.raise_for_status()
+
+    chunks = response.iter_content(chunk_size=CHUNK_SIZE)
+    buf = bytearray()
+    try:
+        for chunk in chunks:
+            buf += chunk
+            if len(buf) > spill_bytes:
+                return _spill(buf, chunks)
+    finally:
+        response.close()
+    return buf
+
+
+def open_source(source):
+    """Open a fetch_pdf() result (in-memory buffer or file path) with fitz."""
+    if isinstance(source, str):
+        return fitz.open(source)
+    return fitz.open(stream=source, filetype='pdf')
+
+
+@contextmanager
+def pdf_source(url, **kwargs):
+    """
+    fetch_pdf() as a context manager that removes a spilled temp file on exit.
+
+    Use this when the PDF has to be opened more than once, e.g. by worker
+    processes that each open their own fitz.Document.
+    """
+    source = fetch_pdf(url, **kwargs)
+    try:
+        yield source
+    finally:
+        if isinstance(source, str):
+            os.unlink(source)
+
+
+def open_pdf(url, **kwargs):
+    """
+    Download a PDF and return it as an open fitz.Document (the caller closes it).
+
+    Keyword arguments are passed to fetch_pdf.
+    """
+    source = fetch_pdf(url, **kwargs)
+    if not isinstance(source, str):
+        return open_source(source)
+    try:
+        return open_source(source)
+    finally:
+        # MuPDF keeps its own handle open, so the name can go right away (POSIX)
+        try:
+            os.unlink(source)
+        except OSError:
+            pass
+
+
+@contextmanager
+def source_path(source):
+    """Yield a file path for a fetch_pdf() result, spilling a buffer to a temp file if needed."""
+    if isinstance(source, str):
+        yield source
+        return
+    tmp = tempfile.NamedTemporaryFile(suffix='.pdf', delete=False)
+    try:
+        with tmp:
+            tmp.write(source)
+        yield tmp.name
+    finally:
+        os.unlink(tmp.name)
+
+
+_worker_doc = None
+
+
+def _open_worker_document(source):
+    global _worker_doc
+    _worker_doc = open_source(source)
+
+
+def _close_worker_document():
+    global _worker_doc
+    if _worker_doc is not None:
+        _worker_doc.close()
+        _worker_doc = None
+
+
+def worker_document():
+    """The fitz.Document opened for the current document_pool() worker."""
+    return _worker_doc
+
+
+@contextmanager
+def document_pool(source, workers):
+    """
+    Yield a map(fn, *iterables) whose calls can use worker_document().
+
+    With one worker everything runs inline on a document opened (and closed
+    afterwards) in this process; consume the results inside the with block.
+    Otherwise a process pool is started whose workers open the PDF from a
+    path, never receiving the bytes themselves.
+    """
+    if workers == 1:
+        _open_worker_document(source)
+        try:
+            yield map
+        finally:
+            _close_worker_document()
+        return
+    with source_path(source) as path:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_open_worker_document,
+                                 initargs=(path,)) as pool:
+            yield pool.map
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Rasterize PDF figures by caption region.
+
+Most arXiv figures are vector drawings, which page.get_images never returns.
+Instead, each "Figure N:" caption is located from the page's text blocks, the
+drawings and images directly above it are grouped into the figure's bounding
+box, and only that clip is rendered with get_pixmap at the target DPI. Pages
+are rendered in parallel by a process pool, each worker opening its own copy
+of the document.
+"""
+import os
+import re
+from itertools import repeat
+from pathlib import Path
+import fitz  # PyMuPDF
+import blob_store
+from pdf_fetch import document_pool, open_source, worker_document
+
+DEFAULT_DPI = 200
+# Vertical gap (points) still treated as part of the same figure
+MAX_GAP = 24
+# Whitespace (points) kept around the rendered figure
+PADDING = 4
+# Text blocks longer than this are body paragraphs, never figure labels
+MAX_LABEL_CHARS = 120
+# Regions smaller than this (points) are rules or stray glyphs, not figures
+MIN_FIGURE_SIZE = 20
+
+CAPTION_RE = re.compile(r'^\s*(?:Figure|Fig\.)\s*(\d+)\s*[:.|]')
+
+
+def find_captions(page):
+    """Return [(figure_number, caption_rect, caption_text)] for a page."""
+    captions = []
+    for x0, y0, x1, y1, text, _block_no, block_type in page.get_text('blocks'):
+        if block_type != 0:
+            continue
+        match = CAPTION_RE.match(text)
+        if match:
+            captions.append((int(match.group(1)), fitz.Rect(x0, y0, x1, y1), ' '.join(text.split())))
+    return captions
+
+
+def figure_rect(page, caption_rect, ceiling=0):
+    """
+    Compute the bounding box of the figure above a caption.
+
+    Drawings and images are grown into a region upwards from the caption,
+    as long as each next piece is within MAX_GAP of the region and
+    horizontally overlaps it; short text blocks inside the region (axis
+    labels, legends) are then added. ceiling is the lowest y the figure may
+    reach (the bottom of the previous caption on the page).
+    """
+    graphics = [d['rect'] for d in page.get_drawings()]
+    graphics += [fitz.Rect(info['bbox']) for info in page.get_image_info()]
+    # Axis lines have zero width or height, so only drop rects with no extent at all
+    graphics = [r for r in graphics if r.y1 <= caption_rect.y0 + 2 and r.y0 >= ceiling
+                and (r.width > 0 or r.height > 0)]
+    graphics.sort(key=lambda r: -r.y1)
+
+    region = None
+    span = fitz.Rect(caption_rect.x0, caption_rect.y0, caption_rect.x1, caption_rect.y0)
+    merged = set()
+    changed = True
+    while changed:
+        changed = False
+        for i, r in enumerate(graphics):
+            if i in merged:
+                continue
+            bounds = region or span
+            if r.y1 < bounds.y0 - MAX_GAP or not (r.x0 <= bounds.x1 and bounds.x0 <= r.x1):
+                continue
+            region = fitz.Rect(r) if region is None else region | r
+            merged.add(i)
+            changed = True
+
+    if region is None:
+        return None
+
+    for x0, y0, x1, y1, text, _block_no, block_type in page.get_text('blocks'):
+        block = fitz.Rect(x0, y0, x1, y1)
+        if block_type == 0 and len(text) <= MAX_LABEL_CHARS and block.y1 <= caption_rect.y0 + 2 \
+                and block.y0 >= ceiling and (region + (-PADDING, -PADDING, PADDING, PADDING)).intersects(block):
+            region |= block
+
+    region = (region + (-PADDING, -PADDING, PADDING, PADDING)) & page.rect
+    if region.width < MIN_FIGURE_SIZE or region.height < MIN_FIGURE_SIZE:
+        return None
+    return region
+
+
+def _render_page(page_num, numbers, output_dir, dpi):
+    """Render the captioned figures with the given numbers on one (0-based) page."""
+    page = worker_document()[page_num]
+    figures = []
+    ceiling = 0
+    for number, caption_rect, caption in sorted(find_captions(page), key=lambda c: c[1].y0):
+        clip = figure_rect(page, caption_rect, ceiling) if number in numbers else None
+        ceiling = caption_rect.y1
+        if clip is None:
+            continue
+        numbers.discard(number)
+        pix = page.get_pixmap(clip=clip, dpi=dpi)
+        filename = f"figure_{number:03d}.png"
+        image_bytes = pix.tobytes('png')
+        # Through the store: the old file may be a hardlink to a blob
+        blob_store.save_bytes(image_bytes, os.path.join(output_dir, filename))
+        figures.append({
+            'filename': filename,
+            'page': page_num + 1,
+            'format': 'png',
+            'width': pix.width,
+            'height': pix.height,
+            'size_bytes': len(image_bytes),
+            'caption': caption,
+        })
+    return figures
+
+
+def render_figures(source, output_dir, dpi=DEFAULT_DPI, workers=None):
+    """
+    Render every captioned figure of a PDF into output_dir as figure_NNN.png.
+
+    Args:
+        source: PDF as bytes/bytearray or a file path (see pdf_fetch.fetch_pdf)
+        output_dir: Directory to write the figures to
+        dpi: Target resolution of the rendered clips
+        workers: Worker processes (defaults to the CPU count)
+
+    Returns:
+        (page_count, figures) where figures is a list of manifest entries in
+        page order; a figure number is only rendered once
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    # Plan which page renders which figure; a number captioned twice (e.g. a
+    # continued figure) is only rendered from its first page
+    doc = open_source(source)
+    try:
+        page_count = len(doc)
+        plan = {}
+        seen = set()
+        for page_num in range(page_count):
+            numbers = {number for number, _rect, _text in find_captions(doc[page_num])} - seen
+            if numbers:
+                plan[page_num] = numbers
+                seen |= numbers
+    finally:
+        doc.close()
+
+    if not plan:
+        return page_count, []
+
+    pages = sorted(plan)
+    numbers = [plan[n] for n in pages]
+    workers = min(workers or os.cpu_count() or 1, len(pages))
+    with document_pool(source, workers) as map_:
+        results = list(map_(_render_page, pages, numbers, repeat(str(output_dir)), repeat(dpi)))
+
+    return page_count, [figure for page_figures in results for figure in page_figures]
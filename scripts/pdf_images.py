@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Parallel extraction of embedded raster images from a PDF.
+
+Every distinct image xref is extracted exactly once: a logo repeated in every
+page header is decoded and written a single time. Soft masks (the alpha
+channels of other images) and tiny images such as bullets are skipped using
+the xref metadata from page.get_images, before anything is decoded. The
+remaining xrefs are split into contiguous page ranges that a process pool
+extracts in parallel, each worker opening its own copy of the document.
+"""
+import os
+from itertools import repeat
+from pathlib import Path
+import blob_store
+from pdf_fetch import document_pool, open_source, worker_document
+
+# Images narrower or shorter than this (in pixels) are icons, bullets or rules
+MIN_IMAGE_SIZE = 32
+# Page ranges handed to each worker; more than one keeps the pool balanced
+BATCHES_PER_WORKER = 4
+
+def collect_xrefs(doc, min_size=MIN_IMAGE_SIZE):
+    """
+    Return [(xref, page_number)] for every distinct, non-trivial image.
+
+    page_number is the first (1-based) page the image appears on.
+    """
+    first_page = {}
+    smasks = set()
+    for page_num in range(len(doc)):
+        for img in doc.get_page_images(page_num, full=True):
+            xref, smask, width, height = img[:4]
+            if smask:
+                smasks.add(smask)
+            if xref in first_page or width < min_size or height < min_size:
+                continue
+            first_page[xref] = page_num + 1
+    # A soft mask can be referenced after it was first seen as an image
+    return [(xref, page) for xref, page in first_page.items() if xref not in smasks]
+
+
+def _extract_batch(tasks, output_dir):
+    """Extract one page range of (index, xref, page) tasks into output_dir."""
+    images = []
+    doc = worker_document()
+    for index, xref, page in tasks:
+        base_image = doc.extract_image(xref)
+        if not base_image:
+            continue
+        image_bytes = base_image['image']
+        image_ext = base_image['ext']
+        filename = f"figure_{index:03d}.{image_ext}"
+        # Through the store: the old file may be a hardlink to a blob
+        blob_store.save_bytes(image_bytes, os.path.join(output_dir, filename))
+        images.append({
+            'filename': filename,
+            'page': page,
+            'format': image_ext,
+            'width': base_image.get('width'),
+            'height': base_image.get('height'),
+            'size_bytes': len(image_bytes),
+        })
+    return images
+
+
+def _split(tasks, parts):
+    """Split tasks (already in page order) into at most parts contiguous runs."""
+    size = -(-len(tasks) // parts)
+    return [tasks[i:i + size] for i in range(0, len(tasks), size)]
+
+
+def extract_images(source, output_dir, workers=None, min_size=MIN_IMAGE_SIZE):
+    """
+    Extract the distinct images of a PDF into output_dir as figure_NNN.<ext>.
+
+    Args:
+        source: PDF as bytes/bytearray or a file path (see pdf_fetch.fetch_pdf)
+        output_dir: Directory to write the images to
+        workers: Worker processes (defaults to the CPU count)
+        min_size: Skip images smaller than this many pixels in either dimension
+
+    Returns:
+        (page_count, images) where images is a list of manifest entries in
+        page order
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    doc = open_source(source)
+    try:
+        page_count = len(doc)
+        xrefs = collect_xrefs(doc, min_size)
+    finally:
+        doc.close()
+
+    tasks = [(index, xref, page) for index, (xref, page) in enumerate(xrefs, 1)]
+    if not tasks:
+        return page_count, []
+
+    workers = min(workers or os.cpu_count() or 1, len(tasks))
+    batches = _split(tasks, workers * BATCHES_PER_WORKER) if workers > 1 else [tasks]
+    with document_pool(source, workers) as map_:
+        results = map_(_extract_batch, batches, repeat(str(output_dir)))
+        images = [image for batch in results for image in batch]
+    return page_count, images
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Adaptive per-host rate limiting for the shared HTTP client.
+
+Each host gets a token bucket whose rate follows AIMD: every successful
+response nudges the rate up, while 429/503 and other 5xx responses (and
+connection errors) halve it and empty the bucket. A Retry-After header blocks
+the host until the server says it is ready again, but never for more than
+MAX_RETRY_AFTER seconds: a longer (misconfigured or hostile) value blocks
+the host for MAX_RETRY_AFTER and fails the request with RetryAfterTooLong,
+which download_engine does not retry. This replaces the fixed time.sleep()
+calls the scripts used for politeness and retry backoff.
+"""
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+INITIAL_RATE = 8.0    # requests per second for a host we have not seen yet
+MIN_RATE = 0.2
+MAX_RATE = 32.0
+RATE_INCREASE = 1.0   # added after every healthy response
+BURST = 8.0           # tokens a host may accumulate while idle
+THROTTLE_STATUSES = (429, 503)
+# Longest Retry-After honoured, in seconds (CCBLOG_MAX_RETRY_AFTER overrides)
+MAX_RETRY_AFTER = float(os.environ.get('CCBLOG_MAX_RETRY_AFTER', 120))
+
+
+class RetryAfterTooLong(Exception):
+    """A server asked to wait longer than the limiter's max_retry_after."""
+
+    def __init__(self, url, delay, limit):
+        super().__init__(f"Retry-After of {delay:.0f}s for {url} exceeds the {limit:.0f}s limit")
+        self.url = url
+        self.delay = delay
+
+
+class _Bucket:
+    def __init__(self):
+        self.rate = INITIAL_RATE
+        self.tokens = BURST
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def refill(self, now):
+        self.tokens = min(BURST, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+
+def parse_retry_after(value):
+    """Return the delay in seconds from a Retry-After header, or None."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+class RateLimiter:
+    """Thread-safe collection of per-host token buckets."""
+
+    def __init__(self, max_retry_after=MAX_RETRY_AFTER):
+        self.max_retry_after = max_retry_after
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def _bucket(self, url):
+        host = urlparse(url).netloc.lower()
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            bucket = self._buckets[host] = _Bucket()
+        return bucket
+
+    def acquire(self, url):
+        """Block until a request to url's host is allowed."""
+        while True:
+            with self._lock:
+                bucket = self._bucket(url)
+                now = time.monotonic()
+                bucket.refill(now)
+                if now >= bucket.blocked_until and bucket.tokens >= 1:
+                    bucket.tokens -= 1
+                    return
+                wait = max(bucket.blocked_until - now, (1 - bucket.tokens) / bucket.rate)
+            time.sleep(wait)
+
+    def _slow_down(self, bucket, delay=None):
+        bucket.rate = max(MIN_RATE, bucket.rate / 2)
+        bucket.tokens = 0.0
+        if delay:
+            bucket.blocked_until = max(bucket.blocked_until, time.monotonic() + delay)
+
+    def feedback(self, url, status_code, retry_after=None):
+        """
+        Adjust the host's rate from a response status (and Retry-After header).
+
+        Raises RetryAfterTooLong (after blocking the host for max_retry_after)
+        if the server asks for a longer wait.
+        """
+        delay = parse_retry_after(retry_after) if status_code in THROTTLE_STATUSES else None
+        with self._lock:
+            bucket = self._bucket(url)
+            if status_code in THROTTLE_STATUSES:
+                self._slow_down(bucket, min(delay, self.max_retry_after) if delay else None)
+            elif status_code >= 500:
+                self._slow_down(bucket)
+            elif status_code < 400:
+                bucket.rate = min(MAX_RATE, bucket.rate + RATE_INCREASE)
+        if delay and delay > self.max_retry_after:
+            raise RetryAfterTooLong(url, delay, self.max_retry_after)
+
+    def failed(self, url):
+        """Back off after a connection error or timeout."""
+        with self._lock:
+            self._slow_down(self._bucket(url))
+
+    def rate(self, url):
+        """Current allowed request rate for url's host (requests per second)."""
+        with self._lock:
+            return self._bucket(url).rate
+
+
+# Shared by every request made through http_client
+limiter = RateLimiter()
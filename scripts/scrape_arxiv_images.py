@@ -6,34 +6,35 @@ Script to download all images from an arXiv paper HTML page.
 import os
 import json
 import re
-import requests
+import http_client
+import blob_store
 from pathlib import Path
 from urllib.parse import urljoin, urlparse
-from bs4 import BeautifulSoup
-import time
+from html_parser import make_soup
+from download_engine import download_all, reserve_path
+from download_journal import DownloadJournal
 
 def sanitize_filename(filename):
     """Remove special characters from filename."""
     return re.sub(r'[^\w\-_.]', '_', filename)
 
 def download_image(url, save_path, headers=None):
-    """Download an image from URL to save_path."""
-    try:
-        if headers is None:
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36'
-            }
+    """Download an image from URL to save_path (errors propagate so download_engine can retry)."""
+    if headers is None:
+        headers = {
+            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36'
+        }
+
+    # Reuse a copy downloaded earlier (by this or another post)
+    if blob_store.link_cached(url, save_path):
+        return True
 
-        response = requests.get(url, headers=headers, timeout=30)
-        response.raise_for_status()
+    response = http_client.get(url, headers=headers, timeout=30)
+    response.raise_for_status()
 
-        with open(save_path, 'wb') as f:
-            f.write(response.content)
+    blob_store.save_bytes(response.content, save_path, url=url)
 
-        return True
-    except Exception as e:
-        print(f"Error downloading {url}: {e}")
-        return False
+    return True
 
 def scrape_arxiv_images(paper_url, output_dir):
     """
@@ -53,16 +54,18 @@ def scrape_arxiv_images(paper_url, output_dir):
         'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36'
     }
 
-    response = requests.get(paper_url, headers=headers)
+    response = http_client.get(paper_url, headers=headers)
     response.raise_for_status()
 
-    soup = BeautifulSoup(response.content, 'html.parser')
+    soup = make_soup(response.content)
 
     # Find all images
     images = soup.find_all('img')
 
-    downloaded_images = []
-    failed_images = []
+    # The journal lets an interrupted run pick up where it stopped
+    journal = DownloadJournal(output_path)
+    jobs = []
+    reserved = set()
 
     print(f"\nFound {len(images)} image tags in the HTML")
 
@@ -105,26 +108,45 @@ def scrape_arxiv_images(paper_url, output_dir):
             else:
                 filename = f"image_{idx:03d}.png"
 
-        save_path = output_path / filename
+        # Two images can map to the same figure number; never let concurrent
+        # downloads write the same file
+        save_path = reserve_path(output_path, filename, reserved, journal=journal, url=img_url)
+        filename = save_path.name
+
+        print(f"Queued {idx}/{len(images)}: {filename}")
+        jobs.append({
+            'url': img_url,
+            'path': save_path,
+            'filename': filename,
+            'caption': caption,
+            'alt_text': img.get('alt', '')
+        })
 
-        # Download image
-        print(f"Downloading {idx}/{len(images)}: {filename}")
-        if download_image(img_url, save_path, headers):
+    # Download images (bounded per host instead of sleeping between requests)
+    results = download_all(jobs, lambda job: download_image(job['url'], job['path'], headers),
+                           journal=journal)
+
+    downloaded_images = []
+    failed_images = []
+
+    for result in results:
+        job = result.job
+        if result.ok:
             downloaded_images.append({
-                'filename': filename,
-                'original_url': img_url,
-                'caption': caption,
-                'alt_text': img.get('alt', '')
+                'filename': job['filename'],
+                'original_url': job['url'],
+                'caption': job['caption'],
+                'alt_text': job['alt_text']
             })
         else:
+            print(f"Error downloading {job['url']} after {result.attempts} attempts: {result.error}")
             failed_images.append({
-                'url': img_url,
-                'filename': filename
+                'url': job['url'],
+                'filename': job['filename'],
+                'attempts': result.attempts,
+                'error': result.error
             })
 
-        # Be nice to the server
-        time.sleep(0.5)
-
     # Save manifest
     manifest = {
         'paper_url': paper_url,
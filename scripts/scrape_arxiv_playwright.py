@@ -5,9 +5,9 @@ Script to download all images from an arXiv paper using the PDF.
 
 import os
 import json
-import subprocess
 from pathlib import Path
-import fitz  # PyMuPDF
+from pdf_fetch import pdf_source
+from pdf_images import extract_images
 
 def extract_images_from_pdf(pdf_url, output_dir):
     """
@@ -21,57 +21,22 @@ def extract_images_from_pdf(pdf_url, output_dir):
     output_path = Path(output_dir)
     output_path.mkdir(parents=True, exist_ok=True)
 
-    # Download PDF
-    pdf_path = output_path / 'paper.pdf'
+    # Stream the PDF (no temp paper.pdf to write and delete) and extract each
+    # distinct image once, in parallel across page ranges
     print(f"Downloading PDF from {pdf_url}...")
-    subprocess.run(['curl', '-L', '-o', str(pdf_path), pdf_url], check=True)
-
-    # Open PDF
-    print(f"Opening PDF: {pdf_path}")
-    pdf_document = fitz.open(pdf_path)
+    with pdf_source(pdf_url) as source:
+        total_pages, images = extract_images(source, output_path)
 
     downloaded_images = []
-    image_count = 0
-
-    # Iterate through pages
-    for page_num in range(len(pdf_document)):
-        page = pdf_document[page_num]
-        print(f"Processing page {page_num + 1}/{len(pdf_document)}...")
-
-        # Get images from page
-        image_list = page.get_images(full=True)
-
-        for img_index, img in enumerate(image_list):
-            xref = img[0]
-            base_image = pdf_document.extract_image(xref)
-            image_bytes = base_image["image"]
-            image_ext = base_image["ext"]
-
-            image_count += 1
-            filename = f"figure_{image_count:03d}.{image_ext}"
-            save_path = output_path / filename
-
-            # Save image
-            with open(save_path, "wb") as f:
-                f.write(image_bytes)
-
-            downloaded_images.append({
-                'filename': filename,
-                'page': page_num + 1,
-                'size': len(image_bytes),
-                'format': image_ext
-            })
-
-            print(f"  Extracted: {filename}")
-
-    # Save total pages before closing
-    total_pages = len(pdf_document)
-
-    # Close PDF
-    pdf_document.close()
-
-    # Remove PDF file
-    pdf_path.unlink()
+    for info in images:
+        downloaded_images.append({
+            'filename': info['filename'],
+            'page': info['page'],
+            'size': info['size_bytes'],
+            'format': info['format']
+        })
+        print(f"  Extracted: {info['filename']} (page {info['page']})")
+    image_count = len(downloaded_images)
 
     # Save manifest
     manifest = {
@@ -3,10 +3,28 @@
 Script to scrape Google Research blog post content
 """
 
-import requests
-from bs4 import BeautifulSoup
+import http_client
+import cdn_rewrite
+from html_parser import make_soup
+from markdown_walker import to_markdown
 import sys
 
+# Blocks containing any of these are share widgets, labels or related posts
+SKIP_STRINGS = ['Quick links', 'Other posts of interest', 'Labels:', 'Follow us',
+                'Copy link', 'December 3, 2025', 'November', 'Share']
+# Label chips shown under the article
+LABELS = ['Generative AI', 'Machine Intelligence', 'Natural Language Processing']
+
+def skip_element(element):
+    """True for paragraphs and list items that are page chrome, not article text."""
+    if element.name not in ('p', 'li', 'h2', 'h3'):
+        return False
+    text = element.get_text(strip=True)
+    if text in LABELS or any(skip in text for skip in SKIP_STRINGS):
+        return True
+    # Short list items are navigation links rather than content
+    return element.name == 'li' and len(text) <= 10
+
 def scrape_article(url):
     """Scrape the main article content from a Google Research blog post"""
 
@@ -14,18 +32,18 @@ def scrape_article(url):
     headers = {
         'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
     }
-    response = requests.get(url, headers=headers)
+    response = http_client.get(url, headers=headers)
     response.raise_for_status()
 
     # Parse HTML
-    soup = BeautifulSoup(response.text, 'html.parser')
+    soup = make_soup(response.text)
 
     content = []
 
     # Get title
     title = soup.find('h1')
     if title:
-        content.append(title.get_text(strip=True))
+        content.append(f'# {title.get_text(strip=True)}')
         content.append('')
 
     # Get metadata (date and authors)
@@ -44,50 +62,11 @@ def scrape_article(url):
     article_body = soup.find('main')
 
     if article_body:
-        # Get all elements in order
-        for element in article_body.find_all(['p', 'h2', 'h3', 'ul', 'ol', 'li']):
-            # Skip navigation elements
-            if element.find_parent(['nav', 'footer']):
-                continue
-
-            text = element.get_text(strip=True)
-
-            # Skip empty elements
-            if not text:
-                continue
-
-            # Skip unwanted sections
-            if any(skip in text for skip in ['Quick links', 'Other posts of interest',
-                                              'Labels:', 'Follow us', 'Copy link',
-                                              'December 3, 2025', 'November', 'Share']):
-                continue
-
-            # Skip labels section
-            if text in ['Generative AI', 'Machine Intelligence', 'Natural Language Processing']:
-                continue
-
-            # Format based on element type
-            if element.name == 'h2':
-                content.append('')
-                content.append(f'## {text}')
-                content.append('')
-            elif element.name == 'h3':
-                content.append('')
-                content.append(f'### {text}')
-                content.append('')
-            elif element.name in ['ul', 'ol']:
-                # Skip, we'll handle list items directly
-                continue
-            elif element.name == 'li':
-                # Check if it's in the main content area
-                parent_list = element.find_parent(['ul', 'ol'])
-                if parent_list and not parent_list.find_parent(['nav', 'footer']):
-                    # Avoid duplicate list items from nested structures
-                    if len(text) > 10:  # Only meaningful list items
-                        content.append(f'- {text}')
-            elif element.name == 'p':
-                content.append(text)
-                content.append('')
+        # One pass over the article; nav/footer are always dropped and the
+        # title was already emitted above
+        # Image links ask the CDN for the width the optimization stage scales to
+        content.append(to_markdown(article_body, base_url=url, image_url=cdn_rewrite.rewrite,
+                                   skip=lambda element: element is title or skip_element(element)))
 
     # Join and clean up
     result = '\n'.join(content)
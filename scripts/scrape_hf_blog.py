@@ -3,7 +3,9 @@
 Scrape Hugging Face blog post content
 """
 import requests
-from bs4 import BeautifulSoup
+import http_client
+from html_parser import make_soup
+from markdown_walker import to_markdown
 import sys
 
 def scrape_hf_blog(url):
@@ -13,11 +15,11 @@ def scrape_hf_blog(url):
         headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         }
-        response = requests.get(url, headers=headers, timeout=30)
+        response = http_client.get(url, headers=headers, timeout=30)
         response.raise_for_status()
 
         # Parse HTML
-        soup = BeautifulSoup(response.content, 'html.parser')
+        soup = make_soup(response.content)
 
         # Find the main article content
         # Hugging Face blog posts typically use article tag or specific content divs
@@ -31,33 +33,17 @@ def scrape_hf_blog(url):
             print("Could not find main article content", file=sys.stderr)
             return None
 
-        # Extract text content preserving structure
+        # Convert the article to Markdown in a single pass (headings, lists,
+        # code fences and images in document order)
         content_parts = []
 
-        # Get title
+        # Get title, unless the article renders it itself
         title = soup.find('h1')
-        if title:
-            content_parts.append(title.get_text().strip())
-            content_parts.append('=' * len(title.get_text().strip()))
+        if title and article not in title.parents:
+            content_parts.append(f"# {title.get_text().strip()}")
             content_parts.append('')
 
-        # Extract all text from article, preserving paragraphs
-        for element in article.find_all(['p', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'pre', 'code', 'li', 'blockquote']):
-            text = element.get_text().strip()
-            if text:
-                # Add extra spacing for headers
-                if element.name.startswith('h'):
-                    content_parts.append('')
-                    content_parts.append(text)
-                    if element.name == 'h2':
-                        content_parts.append('-' * len(text))
-                    content_parts.append('')
-                elif element.name == 'pre':
-                    content_parts.append('')
-                    content_parts.append(text)
-                    content_parts.append('')
-                else:
-                    content_parts.append(text)
+        content_parts.append(to_markdown(article, base_url=url))
 
         full_text = '\n'.join(content_parts)
 
@@ -5,11 +5,15 @@ Script to scrape images from a Notion page and download them.
 import os
 import json
 import re
-import requests
+import http_client
+import blob_store
+import cdn_rewrite
 from pathlib import Path
-from bs4 import BeautifulSoup
+from html_parser import make_soup
 from urllib.parse import urljoin, urlparse, unquote
-import time
+from download_engine import download_all, reserve_path
+from download_journal import DownloadJournal
+from srcset import best_candidate
 
 def sanitize_filename(filename):
     """Remove special characters and spaces from filename."""
@@ -24,7 +28,7 @@ def sanitize_filename(filename):
 def extract_images_from_notion(html_file, base_url):
     """Extract all image URLs from Notion HTML."""
     with open(html_file, 'r', encoding='utf-8') as f:
-        soup = BeautifulSoup(f.read(), 'html.parser')
+        soup = make_soup(f.read())
 
     images = []
 
@@ -59,10 +63,9 @@ def extract_images_from_notion(html_file, base_url):
     # Look for picture tags
     for picture in soup.find_all('picture'):
         for source in picture.find_all('source'):
-            srcset = source.get('srcset')
-            if srcset:
-                # Take the first URL from srcset
-                url = srcset.split(',')[0].strip().split()[0]
+            # Take the variant closest to the WeChat width
+            url = best_candidate(source.get('srcset'), source.get('sizes'))
+            if url:
                 full_url = urljoin(base_url, url)
                 images.append({
                     'url': full_url,
@@ -82,43 +85,35 @@ def extract_images_from_notion(html_file, base_url):
 
     return unique_images
 
-def download_image(url, output_path, retries=3):
-    """Download an image with retry logic."""
+def download_image(url, output_path):
+    """Download an image (a single attempt; download_engine retries failures)."""
     headers = {
         'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
         'Referer': 'https://notion.site/',
         'Accept': 'image/avif,image/webp,image/apng,image/svg+xml,image/*,*/*;q=0.8',
     }
 
-    for attempt in range(retries):
-        try:
-            print(f"  Downloading (attempt {attempt + 1}/{retries})...")
-            response = requests.get(url, headers=headers, timeout=30, stream=True)
-            response.raise_for_status()
-
-            # Write to file
-            with open(output_path, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    f.write(chunk)
-
-            # Verify file size
-            file_size = os.path.getsize(output_path)
-            if file_size < 100:  # Suspiciously small
-                print(f"  Warning: File size is only {file_size} bytes")
-                return False
-
-            print(f"  Success! Downloaded {file_size} bytes")
-            return True
-
-        except Exception as e:
-            print(f"  Attempt {attempt + 1} failed: {e}")
-            if attempt < retries - 1:
-                time.sleep(2)  # Wait before retry
-            else:
-                print(f"  Failed after {retries} attempts")
-                return False
+    # Ask the CDN for the width the optimization stage scales to
+    fetch_url = cdn_rewrite.rewrite(url)
+
+    # Reuse a copy downloaded earlier (by this or another post)
+    cached_size = blob_store.link_cached(fetch_url, output_path)
+    if cached_size:
+        print(f"  {output_path.name}: reused cached copy ({cached_size} bytes)")
+        return True
+
+    response = http_client.get(fetch_url, headers=headers, timeout=30, stream=True)
+    response.raise_for_status()
+
+    # Write through the shared asset store
+    file_size = blob_store.save_chunks(response.iter_content(chunk_size=8192), output_path, url=fetch_url, min_size=100)
 
-    return False
+    # Verify file size
+    if file_size < 100:  # Suspiciously small
+        raise ValueError(f"file size is only {file_size} bytes")
+
+    print(f"  {output_path.name}: downloaded {file_size} bytes")
+    return True
 
 def main():
     html_file = '/tmp/notion_page.html'
@@ -133,10 +128,11 @@ def main():
     images = extract_images_from_notion(html_file, base_url)
     print(f"Found {len(images)} unique images")
 
-    # Download images
-    manifest = []
-    successful = 0
-    failed = []
+    # Plan filenames up front so downloads can run concurrently; the journal
+    # lets an interrupted run pick up where it stopped
+    journal = DownloadJournal(output_dir)
+    jobs = []
+    reserved = set()
 
     for idx, img_info in enumerate(images, 1):
         url = img_info['url']
@@ -169,26 +165,32 @@ def main():
                 filename += '.png'
 
         # Handle duplicates
-        output_path = output_dir / filename
-        counter = 1
-        while output_path.exists():
-            name, ext = os.path.splitext(filename)
-            output_path = output_dir / f"{name}_{counter}{ext}"
-            counter += 1
+        output_path = reserve_path(output_dir, filename, reserved, journal=journal, url=url)
 
         print(f"  Saving to: {output_path}")
+        jobs.append({'url': url, 'path': output_path, 'info': img_info})
+
+    # Download
+    results = download_all(jobs, lambda job: download_image(job['url'], job['path']), journal=journal)
+
+    manifest = []
+    successful = 0
+    failed = []
 
-        # Download
-        if download_image(url, output_path):
+    for result in results:
+        img_info = result.job['info']
+        output_path = result.job['path']
+        if result.ok:
             successful += 1
             manifest.append({
                 'filename': output_path.name,
-                'original_url': url,
-                'alt_text': alt,
+                'original_url': img_info['url'],
+                'alt_text': img_info['alt'],
                 'tag': img_info['tag']
             })
         else:
-            failed.append({'url': url, 'alt': alt})
+            failed.append({'url': img_info['url'], 'alt': img_info['alt'],
+                           'attempts': result.attempts, 'error': result.error})
             # Remove failed download file if it exists
             if output_path.exists():
                 output_path.unlink()
@@ -196,7 +198,7 @@ def main():
     # Save manifest
     manifest_path = output_dir / 'images.json'
     with open(manifest_path, 'w') as f:
-        json.dump(manifest, f, indent=2)
+        json.dump({'images': manifest, 'failed': failed}, f, indent=2)
 
     # Print summary
     print("\n" + "="*60)
@@ -213,6 +215,7 @@ def main():
         for f in failed:
             print(f"  - {f['url']}")
             print(f"    Alt: {f['alt']}")
+            print(f"    Error after {f['attempts']} attempts: {f['error']}")
 
     # Verify no spaces in filenames
     print("\nVerifying filenames...")
@@ -2,12 +2,16 @@
 """
 Scrape images from a Notion page
 """
-import requests
-from bs4 import BeautifulSoup
+import json
+import http_client
+import blob_store
+import cdn_rewrite
 from pathlib import Path
-from urllib.parse import urljoin, urlparse
-import time
+from urllib.parse import urlparse
 import re
+from download_engine import download_all, reserve_path
+from download_journal import DownloadJournal
+from image_stream import stream_page_images
 
 def sanitize_filename(filename):
     """Remove special characters and replace spaces with underscores"""
@@ -19,127 +23,54 @@ def sanitize_filename(filename):
     filename = re.sub(r'_+', '_', filename)
     return filename.strip('_')
 
-def get_notion_page(url):
-    """Fetch Notion page with appropriate headers"""
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-        'Accept-Language': 'en-US,en;q=0.5',
-        'Accept-Encoding': 'gzip, deflate, br',
-        'Connection': 'keep-alive',
-        'Upgrade-Insecure-Requests': '1',
-        'Sec-Fetch-Dest': 'document',
-        'Sec-Fetch-Mode': 'navigate',
-        'Sec-Fetch-Site': 'none',
-    }
-
-    response = requests.get(url, headers=headers, timeout=30)
+# Browser-like headers for the page request
+PAGE_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.5',
+    'Accept-Encoding': 'gzip, deflate, br',
+    'Connection': 'keep-alive',
+    'Upgrade-Insecure-Requests': '1',
+    'Sec-Fetch-Dest': 'document',
+    'Sec-Fetch-Mode': 'navigate',
+    'Sec-Fetch-Site': 'none',
+}
+
+IMAGE_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+    'Referer': 'https://www.notion.so/'
+}
+
+def download_image(url, output_path, headers=None):
+    """Download one image (retries are scheduled by download_engine)"""
+    # Ask the CDN for the width the optimization stage scales to
+    fetch_url = cdn_rewrite.rewrite(url)
+
+    # Reuse a copy downloaded earlier (by this or another post)
+    if blob_store.link_cached(fetch_url, output_path):
+        return True
+
+    response = http_client.get(fetch_url, headers=headers or IMAGE_HEADERS, timeout=30, stream=True)
     response.raise_for_status()
-    return response.text
-
-def extract_images(html_content, base_url):
-    """Extract all image URLs from HTML content"""
-    soup = BeautifulSoup(html_content, 'html.parser')
-    images = []
-
-    # Find all img tags
-    for img in soup.find_all('img'):
-        src = img.get('src') or img.get('data-src')
-        if src:
-            # Convert relative URLs to absolute
-            full_url = urljoin(base_url, src)
-
-            # Skip data URIs and very small images (likely icons)
-            if full_url.startswith('data:'):
-                continue
-
-            # Get alt text for filename
-            alt_text = img.get('alt', '')
-
-            images.append({
-                'url': full_url,
-                'alt': alt_text
-            })
-
-    # Also look for picture elements
-    for picture in soup.find_all('picture'):
-        sources = picture.find_all('source')
-        for source in sources:
-            srcset = source.get('srcset')
-            if srcset:
-                # Take the first URL from srcset
-                url = srcset.split(',')[0].split()[0]
-                full_url = urljoin(base_url, url)
-                if not full_url.startswith('data:'):
-                    images.append({
-                        'url': full_url,
-                        'alt': ''
-                    })
-
-    return images
-
-def download_image(url, output_path, headers=None, max_retries=3):
-    """Download an image with retry logic"""
-    if headers is None:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-            'Referer': 'https://www.notion.so/'
-        }
-
-    for attempt in range(max_retries):
-        try:
-            response = requests.get(url, headers=headers, timeout=30, stream=True)
-            response.raise_for_status()
-
-            # Verify it's actually an image
-            content_type = response.headers.get('Content-Type', '')
-            if 'image' not in content_type and 'octet-stream' not in content_type:
-                print(f"  Warning: URL doesn't appear to be an image: {content_type}")
-
-            # Write to file
-            with open(output_path, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    f.write(chunk)
-
-            return True
-
-        except Exception as e:
-            print(f"  Attempt {attempt + 1} failed: {e}")
-            if attempt < max_retries - 1:
-                time.sleep(2 ** attempt)  # Exponential backoff
-
-    return False
-
-def main():
-    url = "https://www.notion.so/sagnikm/Who-is-Adam-SGD-Might-Be-All-We-Need-For-RLVR-In-LLMs-1cd2c74770c080de9cbbf74db14286b6"
-    output_dir = Path("/home/limo/ccblog/blog/adam-sgd-rlvr")
-
-    # Create output directory
-    output_dir.mkdir(parents=True, exist_ok=True)
-
-    print(f"Fetching Notion page: {url}")
-    try:
-        html_content = get_notion_page(url)
-    except Exception as e:
-        print(f"Error fetching page: {e}")
-        return
 
-    print("Extracting images...")
-    images = extract_images(html_content, url)
+    # Verify it's actually an image
+    content_type = response.headers.get('Content-Type', '')
+    if 'image' not in content_type and 'octet-stream' not in content_type:
+        print(f"  Warning: URL doesn't appear to be an image: {content_type}")
 
-    if not images:
-        print("No images found on the page")
-        return
+    # Write through the shared asset store
+    blob_store.save_chunks(response.iter_content(chunk_size=8192), output_path,
+                           url=fetch_url, content_type=content_type)
 
-    print(f"Found {len(images)} images")
+    return True
 
-    # Download images
-    manifest = []
-    successful = 0
+def plan_jobs(images, output_dir, journal):
+    """Turn image candidates into download jobs as they arrive from the page stream"""
+    reserved = set()
 
     for idx, img_info in enumerate(images, 1):
         img_url = img_info['url']
-        alt_text = img_info['alt']
+        alt_text = img_info['alt'] if img_info['tag'] in ('img', 'source') else ''
 
         # Generate filename
         parsed_url = urlparse(img_url)
@@ -157,43 +88,66 @@ def main():
         # Sanitize the final filename
         filename = sanitize_filename(filename)
 
-        # Avoid conflicts
-        output_path = output_dir / filename
-        counter = 1
-        while output_path.exists():
-            stem = Path(filename).stem
-            ext = Path(filename).suffix
-            filename = f"{stem}_{counter}{ext}"
-            output_path = output_dir / filename
-            counter += 1
-
-        print(f"Downloading [{idx}/{len(images)}]: {filename}")
+        # Avoid conflicts (with files on disk and names already handed out)
+        output_path = reserve_path(output_dir, filename, reserved, journal=journal, url=img_url)
+
+        print(f"Queued [{idx}]: {output_path.name}")
         print(f"  URL: {img_url}")
+        yield {'url': img_url, 'path': output_path, 'alt': alt_text}
 
-        if download_image(img_url, output_path):
+def main():
+    url = "https://www.notion.so/sagnikm/Who-is-Adam-SGD-Might-Be-All-We-Need-For-RLVR-In-LLMs-1cd2c74770c080de9cbbf74db14286b6"
+    output_dir = Path("/home/limo/ccblog/blog/adam-sgd-rlvr")
+
+    # Create output directory
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    # Images are picked out of the page while it is still downloading and go
+    # straight to the download engine, so the page fetch and figure downloads
+    # overlap
+    print(f"Fetching Notion page: {url}")
+    journal = DownloadJournal(output_dir)
+    images = stream_page_images(url, headers=PAGE_HEADERS)
+    try:
+        results = download_all(plan_jobs(images, output_dir, journal),
+                               lambda job: download_image(job['url'], job['path']), journal=journal)
+    except Exception as e:
+        print(f"Error fetching page: {e}")
+        return
+
+    if not results:
+        print("No images found on the page")
+        return
+
+    # Build the manifest in page order
+    manifest = []
+    successful = 0
+    failed = []
+
+    for result in results:
+        output_path = result.job['path']
+        if result.ok:
             successful += 1
             manifest.append({
-                'filename': filename,
-                'original_url': img_url,
-                'alt_text': alt_text,
+                'filename': output_path.name,
+                'original_url': result.job['url'],
+                'alt_text': result.job['alt'],
                 'size_bytes': output_path.stat().st_size
             })
             print(f"  Success: {output_path}")
         else:
-            print(f"  Failed to download")
-
-        # Be polite to the server
-        time.sleep(0.5)
+            print(f"  Failed to download {output_path.name} after {result.attempts} attempts: {result.error}")
+            failed.append({'url': result.job['url'], 'alt': result.job['alt'],
+                           'attempts': result.attempts, 'error': result.error})
 
     # Save manifest
-    import json
     manifest_path = output_dir / "images.json"
     with open(manifest_path, 'w') as f:
-        json.dump(manifest, f, indent=2)
+        json.dump({'images': manifest, 'failed': failed}, f, indent=2)
 
     print(f"\n{'='*60}")
     print(f"Download complete!")
-    print(f"Successfully downloaded: {successful}/{len(images)} images")
+    print(f"Successfully downloaded: {successful}/{len(results)} images")
     print(f"Saved to: {output_dir}")
     print(f"Manifest: {manifest_path}")
     print(f"{'='*60}")
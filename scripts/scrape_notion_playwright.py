@@ -2,13 +2,18 @@
 """
 Scrape images from a Notion page using Playwright
 """
-from playwright.sync_api import sync_playwright
 from pathlib import Path
 from urllib.parse import urlparse, urljoin
-import time
+import sys
 import re
-import requests
+import http_client
+import blob_store
+import cdn_rewrite
 import json
+from browser_pool import BrowserPool, block_resources, capture_image_responses, wait_for_images
+from site_adapters import adapter_for
+from download_engine import download_all, reserve_path
+from download_journal import DownloadJournal
 
 def sanitize_filename(filename):
     """Remove special characters and replace spaces with underscores"""
@@ -20,73 +25,73 @@ def sanitize_filename(filename):
     filename = re.sub(r'_+', '_', filename)
     return filename.strip('_')
 
-def download_image(url, output_path, max_retries=3):
-    """Download an image with retry logic"""
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-        'Referer': 'https://www.notion.so/'
-    }
-
-    for attempt in range(max_retries):
-        try:
-            response = requests.get(url, headers=headers, timeout=30, stream=True)
-            response.raise_for_status()
-
-            # Write to file
-            with open(output_path, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    f.write(chunk)
-
-            return True
-
-        except Exception as e:
-            print(f"  Attempt {attempt + 1} failed: {e}")
-            if attempt < max_retries - 1:
-                time.sleep(2 ** attempt)
-
-    return False
-
-def main():
-    url = "https://www.notion.so/sagnikm/Who-is-Adam-SGD-Might-Be-All-We-Need-For-RLVR-In-LLMs-1cd2c74770c080de9cbbf74db14286b6"
-    output_dir = Path("/home/limo/ccblog/blog/adam-sgd-rlvr")
+IMAGE_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+    'Referer': 'https://www.notion.so/'
+}
+
+def download_image(url, output_path):
+    """Download one image the browser did not capture (retries are scheduled by download_engine)"""
+    # Ask the CDN for the width the optimization stage scales to
+    fetch_url = cdn_rewrite.rewrite(url)
+
+    # Reuse a copy downloaded earlier (by this or another post)
+    if blob_store.link_cached(fetch_url, output_path):
+        return True
+
+    response = http_client.get(fetch_url, headers=IMAGE_HEADERS, timeout=30, stream=True)
+    response.raise_for_status()
+
+    # Write through the shared asset store
+    blob_store.save_chunks(response.iter_content(chunk_size=8192), output_path, url=fetch_url)
+
+    return True
+
+def save_captured(response, job, journal):
+    """Write an image body the browser already downloaded; returns False if unavailable"""
+    try:
+        body = response.body()
+    except Exception as e:
+        print(f"  Could not read captured body ({e}), downloading instead")
+        return False
+    if not body:
+        return False
+    blob_store.save_bytes(body, job['path'], url=job['url'],
+                          content_type=response.headers.get('content-type'))
+    journal.record(job['path'], job['url'])
+    return True
+
+# (page URL, output directory) pairs scraped when no arguments are given
+POSTS = [
+    ("https://www.notion.so/sagnikm/Who-is-Adam-SGD-Might-Be-All-We-Need-For-RLVR-In-LLMs-1cd2c74770c080de9cbbf74db14286b6",
+     "/home/limo/ccblog/blog/adam-sgd-rlvr"),
+]
+
+def scrape_page(pool, url, output_dir):
+    """Scrape one Notion page with a page from the warm browser pool"""
+    output_dir = Path(output_dir)
 
     # Create output directory
     output_dir.mkdir(parents=True, exist_ok=True)
+    journal = DownloadJournal(output_dir)
+
+    with pool.page() as page:
+        # Keep every image response the browser receives while loading and scrolling
+        captured = capture_image_responses(page)
 
-    with sync_playwright() as p:
-        print("Launching browser...")
-        browser = p.chromium.launch(headless=True)
-        context = browser.new_context(
-            user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        )
-        page = context.new_page()
+        # Abort fonts, media, trackers and third-party scripts before anything loads
+        adapter = adapter_for(url)
+        blocked = block_resources(page, adapter.block_profile, page_url=url)
 
+        # The content is rendered client-side, so readiness is decided by
+        # wait_for_images rather than by waiting for the network to go idle
         print(f"Loading page: {url}")
-        page.goto(url, wait_until='networkidle', timeout=60000)
+        page.goto(url, wait_until='domcontentloaded', timeout=60000)
 
-        # Scroll to load all images
+        # Scroll through the page and wait until the lazy images have arrived
         print("Scrolling to load all images...")
-        page.evaluate("""
-            () => {
-                return new Promise((resolve) => {
-                    let totalHeight = 0;
-                    const distance = 500;
-                    const timer = setInterval(() => {
-                        const scrollHeight = document.body.scrollHeight;
-                        window.scrollBy(0, distance);
-                        totalHeight += distance;
-
-                        if(totalHeight >= scrollHeight){
-                            clearInterval(timer);
-                            setTimeout(resolve, 1000);
-                        }
-                    }, 100);
-                });
-            }
-        """)
-
-        # Wait for images to load
-        time.sleep(3)
+        wait_for_images(page, root_selector='.notion-page-content', scroll_selector=adapter.scroll_selector)
+        print(f"Blocked {blocked['blocked']} unneeded requests")
 
         # Extract all image sources
         print("Extracting images...")
@@ -119,76 +124,89 @@ def main():
             }
         """)
 
-        browser.close()
-
-    if not images:
-        print("No images found on the page")
-        return
-
-    print(f"Found {len(images)} images")
-
-    # Filter out very small images (likely icons)
-    images = [img for img in images if img['width'] > 100 and img['height'] > 100]
-    print(f"After filtering small images: {len(images)} images remain")
-
-    # Download images
+        if not images:
+            print("No images found on the page")
+            return
+
+        print(f"Found {len(images)} images")
+
+        # Filter out very small images (likely icons)
+        images = [img for img in images if img['width'] > 100 and img['height'] > 100]
+        print(f"After filtering small images: {len(images)} images remain")
+
+        # Plan filenames in page order
+        jobs = []
+        reserved = set()
+
+        for idx, img_info in enumerate(images, 1):
+            img_url = img_info['url']
+            alt_text = img_info['alt']
+
+            # Generate filename
+            parsed_url = urlparse(img_url)
+            original_filename = Path(parsed_url.path).name
+
+            # Use alt text if available and meaningful
+            if alt_text and len(alt_text) > 3:
+                base_name = sanitize_filename(alt_text[:50])
+                extension = Path(original_filename).suffix or '.png'
+                filename = f"{base_name}{extension}"
+            else:
+                # Use a descriptive name based on the order
+                extension = Path(original_filename).suffix or '.png'
+                filename = f"figure_{idx}{extension}"
+
+            # Sanitize the final filename
+            filename = sanitize_filename(filename)
+
+            # Avoid conflicts
+            output_path = reserve_path(output_dir, filename, reserved, journal=journal, url=img_url)
+            jobs.append({'url': img_url, 'path': output_path, 'info': img_info})
+
+        # Save the bytes the browser already fetched while the page is still
+        # open; only images it never received are downloaded again
+        missing = []
+        for job in jobs:
+            response = captured.get(job['url'])
+            if journal.completed(job['path'], job['url']):
+                missing.append(job)
+            elif response is not None and save_captured(response, job, journal):
+                print(f"Captured: {job['path'].name} ({job['info']['width']}x{job['info']['height']})")
+            else:
+                missing.append(job)
+
+    if missing:
+        print(f"Downloading {len(missing)} images the browser did not capture...")
+    results = download_all(missing, lambda job: download_image(job['url'], job['path']), journal=journal)
+    errors = {id(r.job): r for r in results if not r.ok}
+
+    # Build the manifest in page order
     manifest = []
     successful = 0
-
-    for idx, img_info in enumerate(images, 1):
-        img_url = img_info['url']
-        alt_text = img_info['alt']
-
-        # Generate filename
-        parsed_url = urlparse(img_url)
-        original_filename = Path(parsed_url.path).name
-
-        # Use alt text if available and meaningful
-        if alt_text and len(alt_text) > 3:
-            base_name = sanitize_filename(alt_text[:50])
-            extension = Path(original_filename).suffix or '.png'
-            filename = f"{base_name}{extension}"
-        else:
-            # Use a descriptive name based on the order
-            extension = Path(original_filename).suffix or '.png'
-            filename = f"figure_{idx}{extension}"
-
-        # Sanitize the final filename
-        filename = sanitize_filename(filename)
-
-        # Avoid conflicts
-        output_path = output_dir / filename
-        counter = 1
-        while output_path.exists():
-            stem = Path(filename).stem
-            ext = Path(filename).suffix
-            filename = f"{stem}_{counter}{ext}"
-            output_path = output_dir / filename
-            counter += 1
-
-        print(f"Downloading [{idx}/{len(images)}]: {filename}")
-        print(f"  URL: {img_url[:100]}...")
-        print(f"  Size: {img_info['width']}x{img_info['height']}")
-
-        if download_image(img_url, output_path):
-            successful += 1
-            manifest.append({
-                'filename': filename,
-                'original_url': img_url,
-                'alt_text': alt_text,
-                'dimensions': f"{img_info['width']}x{img_info['height']}",
-                'size_bytes': output_path.stat().st_size
-            })
-            print(f"  Success: {output_path}")
-        else:
-            print(f"  Failed to download")
-
-        time.sleep(0.5)
+    failed = []
+
+    for job in jobs:
+        img_info = job['info']
+        output_path = job['path']
+        if id(job) in errors:
+            result = errors[id(job)]
+            print(f"  Failed to download {output_path.name} after {result.attempts} attempts: {result.error}")
+            failed.append({'url': job['url'], 'alt': img_info['alt'],
+                           'attempts': result.attempts, 'error': result.error})
+            continue
+        successful += 1
+        manifest.append({
+            'filename': output_path.name,
+            'original_url': job['url'],
+            'alt_text': img_info['alt'],
+            'dimensions': f"{img_info['width']}x{img_info['height']}",
+            'size_bytes': output_path.stat().st_size
+        })
 
     # Save manifest
     manifest_path = output_dir / "images.json"
     with open(manifest_path, 'w') as f:
-        json.dump(manifest, f, indent=2)
+        json.dump({'images': manifest, 'failed': failed}, f, indent=2)
 
     print(f"\n{'='*60}")
     print(f"Download complete!")
@@ -220,5 +238,15 @@ def main():
             print(f"    Alt: {item['alt_text']}")
         print(f"    Size: {item['dimensions']} ({item['size_bytes']} bytes)")
 
+def main():
+    # Usage: scrape_notion_playwright.py [URL OUTPUT_DIR ...]
+    args = sys.argv[1:]
+    posts = list(zip(args[::2], args[1::2])) if args else POSTS
+
+    # One warm browser for every post, so only the first pays the cold start
+    with BrowserPool() as pool:
+        for url, output_dir in posts:
+            scrape_page(pool, url, output_dir)
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Scrape one or more posts from any supported site in a single process.
+
+Usage: scrape_site.py URL [URL ...]
+
+The adapter for each URL is picked from site_adapters. Every post gets its
+own directory under CCBLOG_BLOG_DIR with article.md and images.json. Pages
+are fetched statically and rendered in the shared browser pool only when
+they turn out to be client-rendered (see page_fetch). The images of all
+posts go through one download_all call, so fetches to different hosts
+overlap while each host keeps its own limits; once they are done, every post
+is passed through the optimize_images stage.
+"""
+import json
+import os
+import re
+import sys
+from pathlib import Path
+from urllib.parse import urlparse
+import http_client
+import blob_store
+import cdn_rewrite
+from download_engine import download_all, reserve_path
+from download_journal import DownloadJournal
+from site_adapters import adapter_for
+from page_fetch import close_pool, fetch_page
+from pdf_fetch import pdf_source
+from pdf_images import extract_images
+from optimize_images import optimize_post
+
+BLOG_DIR = Path(os.environ.get('CCBLOG_BLOG_DIR', '/home/limo/ccblog/blog'))
+
+# Bodies smaller than this are error placeholders, not images
+MIN_IMAGE_BYTES = 100
+
+
+def post_slug(url):
+    """Directory name for a post: the last meaningful path segment of its URL."""
+    segments = [s for s in urlparse(url).path.split('/') if s]
+    slug = segments[-1] if segments else urlparse(url).netloc
+    slug = re.sub(r'\.(html?|pdf)$', '', slug)
+    return re.sub(r'[^\w\-.]', '-', slug).strip('-') or 'post'
+
+
+def download_image(job):
+    """Fetch one image into job['path'] (download_engine retries failures)."""
+    # Sized by the CDN to the width the optimization stage scales to
+    url = cdn_rewrite.rewrite(job['url'])
+    if blob_store.link_cached(url, job['path']):
+        return True
+    response = http_client.get(url, headers=job['headers'], timeout=30, stream=True)
+    response.raise_for_status()
+    size = blob_store.save_chunks(response.iter_content(chunk_size=8192), job['path'], url=url,
+                                  content_type=response.headers.get('content-type'),
+                                  min_size=MIN_IMAGE_BYTES)
+    if size < MIN_IMAGE_BYTES:
+        raise ValueError(f"{job['path'].name}: response too small ({size} bytes)")
+    return True
+
+
+def plan_html_post(url, adapter, output_dir):
+    """Fetch and parse a page; write article.md and return its image jobs."""
+    page = fetch_page(url, adapter, force_browser=adapter.kind == 'browser')
+    root = adapter.content_root(page.soup)
+
+    with open(output_dir / 'article.md', 'w', encoding='utf-8') as f:
+        f.write(adapter.markdown(root, url) + '\n')
+
+    journal = DownloadJournal(output_dir)
+    reserved = set()
+    jobs = []
+    for idx, image in enumerate(adapter.extract_images(root, url), 1):
+        path = reserve_path(output_dir, adapter.filename(image, idx), reserved, journal=journal,
+                            url=image['url'])
+        jobs.append({'url': image['url'], 'path': path, 'image': image, 'post': url,
+                     'headers': adapter.headers, 'journal': journal})
+    print(f"  {len(jobs)} images queued")
+    return jobs
+
+
+def scrape_pdf_post(url, output_dir):
+    """Extract the embedded images of a PDF paper."""
+    with pdf_source(url) as source:
+        page_count, images = extract_images(source, output_dir)
+    print(f"  {len(images)} images extracted from {page_count} pages")
+    return images
+
+
+def write_manifest(url, adapter, output_dir, images, failed):
+    manifest_path = output_dir / 'images.json'
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump({
+            'source_url': url,
+            'adapter': adapter.name,
+            'images': images,
+            'failed': failed,
+        }, f, indent=2, ensure_ascii=False)
+    return manifest_path
+
+
+def scrape_sites(urls, blog_dir=BLOG_DIR):
+    """Scrape every URL; returns {url: manifest path} for the posts written."""
+    posts = {}
+    jobs = []
+
+    for url in urls:
+        adapter = adapter_for(url)
+        output_dir = blog_dir / post_slug(url)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        print(f"\n[{adapter.name}] {url}\n  -> {output_dir}")
+
+        try:
+            if adapter.kind == 'pdf':
+                images = scrape_pdf_post(url, output_dir)
+                posts[url] = write_manifest(url, adapter, output_dir, images, [])
+            else:
+                post_jobs = plan_html_post(url, adapter, output_dir)
+                jobs.extend(post_jobs)
+                posts[url] = (adapter, output_dir, [], [])
+        except Exception as e:
+            print(f"  Error: {e}")
+
+    # Rendering is done: stop Chromium (and Playwright's event loop) before
+    # the download engine starts its own
+    close_pool()
+
+    # One engine run for every post (each job carries its post's journal)
+    results = download_all(jobs, download_image)
+
+    for result in results:
+        _, _, images, failed = posts[result.job['post']]
+        image = result.job['image']
+        if result.ok:
+            images.append({
+                'filename': result.job['path'].name,
+                'original_url': image['url'],
+                'alt_text': image['alt'],
+                'caption': image['caption'],
+            })
+        else:
+            failed.append({'url': image['url'], 'attempts': result.attempts, 'error': result.error})
+
+    for url, post in posts.items():
+        if isinstance(post, tuple):
+            adapter, output_dir, images, failed = post
+            posts[url] = write_manifest(url, adapter, output_dir, images, failed)
+            print(f"{url}: {len(images)} images, {len(failed)} failed")
+
+    # Resize and recompress for WeChat once every download has finished
+    for url, manifest_path in posts.items():
+        before, after = optimize_post(manifest_path.parent)
+        if before:
+            print(f"{url}: optimized {before} -> {after} bytes")
+    return posts
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print(__doc__.strip())
+        sys.exit(1)
+    scrape_sites(sys.argv[1:])
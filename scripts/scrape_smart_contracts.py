@@ -5,12 +5,16 @@ Script to scrape images from Anthropic's smart contracts blog post
 
 import os
 import json
-import requests
-from bs4 import BeautifulSoup
+import http_client
+import blob_store
+from html_parser import make_content_soup
 from urllib.parse import urljoin, urlparse
 from pathlib import Path
 import time
 import re
+from download_engine import download_all
+from download_journal import DownloadJournal
+from srcset import best_candidate
 
 def sanitize_filename(filename):
     """Remove special characters and spaces from filename"""
@@ -28,34 +32,25 @@ def get_blog_name_from_url(url):
         return path_parts[-1]
     return parsed.netloc.replace('.', '_')
 
-def download_image(img_url, save_path, headers, max_retries=3):
-    """Download an image with retry logic"""
-    for attempt in range(max_retries):
-        try:
-            response = requests.get(img_url, headers=headers, timeout=30, stream=True)
-            response.raise_for_status()
-
-            # Write image to file
-            with open(save_path, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    f.write(chunk)
-
-            # Verify the file was written
-            if os.path.getsize(save_path) > 0:
-                print(f"✓ Downloaded: {os.path.basename(save_path)} ({os.path.getsize(save_path)} bytes)")
-                return True
-            else:
-                print(f"✗ Downloaded file is empty: {save_path}")
-                return False
-
-        except Exception as e:
-            print(f"  Attempt {attempt + 1}/{max_retries} failed: {e}")
-            if attempt < max_retries - 1:
-                time.sleep(2)
-            else:
-                print(f"✗ Failed to download: {img_url}")
-                return False
-    return False
+def download_image(img_url, save_path, headers):
+    """Download one image (retries are scheduled by download_engine)"""
+    # Reuse a copy downloaded earlier (by this or another post)
+    cached_size = blob_store.link_cached(img_url, save_path)
+    if cached_size:
+        print(f"✓ Reused cached copy: {os.path.basename(save_path)} ({cached_size} bytes)")
+        return True
+
+    response = http_client.get(img_url, headers=headers, timeout=30, stream=True)
+    response.raise_for_status()
+
+    # Write image through the shared asset store
+    size = blob_store.save_chunks(response.iter_content(chunk_size=8192), save_path, url=img_url)
+
+    # Verify the file was written
+    if size == 0:
+        raise ValueError(f"downloaded file is empty: {save_path}")
+    print(f"✓ Downloaded: {os.path.basename(save_path)} ({size} bytes)")
+    return True
 
 def scrape_blog_images(url, output_dir):
     """Main function to scrape images from a blog post"""
@@ -70,14 +65,15 @@ def scrape_blog_images(url, output_dir):
 
     print(f"Fetching: {url}")
     try:
-        response = requests.get(url, headers=headers, timeout=30)
+        response = http_client.get(url, headers=headers, timeout=30)
         response.raise_for_status()
     except Exception as e:
         print(f"Error fetching URL: {e}")
         return
 
     # Parse HTML
-    soup = BeautifulSoup(response.content, 'html.parser')
+    # Only the article/main/d-article subtrees are built (full parse if absent)
+    soup = make_content_soup(response.content)
 
     # Find the main content area (adjust selector based on page structure)
     # Try common article content selectors
@@ -113,10 +109,9 @@ def scrape_blog_images(url, output_dir):
         sources = picture.find_all('source')
         for source in sources:
             # Create a fake img tag with the source srcset
-            srcset = source.get('srcset')
-            if srcset:
-                # Take the first URL from srcset
-                url = srcset.split(',')[0].split()[0]
+            # Take the variant closest to the WeChat width
+            url = best_candidate(source.get('srcset'), source.get('sizes'))
+            if url:
                 fake_img = soup.new_tag('img')
                 fake_img['src'] = url
                 fake_img['alt'] = picture.find('img').get('alt', '') if picture.find('img') else ''
@@ -130,9 +125,11 @@ def scrape_blog_images(url, output_dir):
     # Create output directory
     os.makedirs(output_dir, exist_ok=True)
 
-    # Track downloaded images
-    downloaded_images = []
-    failed_images = []
+    # Plan filenames up front so downloads can run concurrently; the journal
+    # lets an interrupted run pick up where it stopped
+    journal = DownloadJournal(output_dir)
+    jobs = []
+    reserved = set()
     counter = 1
 
     for img in images:
@@ -168,28 +165,41 @@ def scrape_blog_images(url, output_dir):
 
         # Handle duplicate filenames
         save_path = os.path.join(output_dir, filename)
-        if os.path.exists(save_path):
+        if filename in reserved or (os.path.exists(save_path) and not journal.owns(filename, img_url)):
             name, ext = os.path.splitext(filename)
             filename = f"{name}_{counter}{ext}"
             save_path = os.path.join(output_dir, filename)
+        reserved.add(filename)
+
+        jobs.append({'url': img_url, 'path': save_path, 'filename': filename, 'alt_text': alt_text})
+        counter += 1
 
-        # Download image
-        if download_image(img_url, save_path, headers):
+    # Download images (bounded per host instead of sleeping between requests)
+    results = download_all(jobs, lambda job: download_image(job['url'], job['path'], headers),
+                           journal=journal)
+
+    # Track downloaded images
+    downloaded_images = []
+    failed_images = []
+
+    for result in results:
+        job = result.job
+        if result.ok:
             downloaded_images.append({
-                'filename': filename,
-                'original_url': img_url,
-                'alt_text': alt_text,
-                'size': os.path.getsize(save_path)
+                'filename': job['filename'],
+                'original_url': job['url'],
+                'alt_text': job['alt_text'],
+                'size': os.path.getsize(job['path'])
             })
         else:
+            print(f"✗ Failed to download: {job['url']} ({result.error})")
             failed_images.append({
-                'url': img_url,
-                'alt_text': alt_text
+                'url': job['url'],
+                'alt_text': job['alt_text'],
+                'attempts': result.attempts,
+                'error': result.error
             })
 
-        counter += 1
-        time.sleep(0.5)  # Be polite, don't hammer the server
-
     # Create manifest file
     manifest = {
         'source_url': url,
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Registry of site adapters used by scrape_site.py.
+
+Each adapter declares, for one site, where the article content lives (CSS
+selectors, tried in order), which images to skip, and how downloaded images
+are named. Selectors and patterns are compiled once at import, and
+adapter_for() picks the adapter from the URL, so one process can scrape many
+posts from different sites without a copy-pasted script per site.
+"""
+import re
+from pathlib import Path
+from urllib.parse import unquote, urljoin, urlparse
+import soupsieve
+from markdown_walker import MarkdownWalker
+from srcset import tag_source
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.webp', '.svg')
+
+
+def sanitize_filename(name):
+    """Keep letters, digits, dash, underscore and dot; collapse the rest to '_'."""
+    name = re.sub(r'[^\w\-.]', '_', name)
+    name = re.sub(r'_+', '_', name)
+    return name.strip('_.')
+
+
+class SiteAdapter:
+    """
+    Scraping rules for one site.
+
+    Args:
+        name: Short identifier (also used in logs)
+        url_pattern: Regex matched against the full URL
+        content_selectors: CSS selectors for the article root, tried in order
+        kind: 'html' (static page, rendered in a browser only if it turns
+            out to be a client-side shell), 'browser' (always rendered) or 'pdf'
+        exclude: Substrings that mark an image URL or alt text as page chrome
+        min_size: Skip images whose width or height attribute is below this
+        filename_rule: 'alt' (alt text first), 'url' (URL basename first) or
+            'figure' (figure_N from the caption, then URL basename)
+        headers: Extra request headers (e.g. a Referer the CDN insists on)
+        block_profile: browser_pool.BLOCK_PROFILES entry used when the page
+            is loaded in a browser
+        scroll_selector: Element the site scrolls instead of the document
+            (for browser_pool.wait_for_images; None to detect it)
+    """
+
+    def __init__(self, name, url_pattern, content_selectors=('article', 'main', 'body'), kind='html',
+                 exclude=(), min_size=0, filename_rule='alt', headers=None, block_profile='content',
+                 scroll_selector=None):
+        self.name = name
+        self.kind = kind
+        self.url_re = re.compile(url_pattern, re.I)
+        self.selectors = tuple(content_selectors)
+        self.content_selectors = [soupsieve.compile(selector) for selector in content_selectors]
+        self.exclude_re = re.compile('|'.join(re.escape(p) for p in exclude), re.I) if exclude else None
+        self.min_size = min_size
+        self.filename_rule = filename_rule
+        self.headers = dict(headers or {})
+        self.block_profile = block_profile
+        self.scroll_selector = scroll_selector
+
+    def __repr__(self):
+        return f"SiteAdapter({self.name!r})"
+
+    def matches(self, url):
+        return bool(self.url_re.match(url))
+
+    def content_root(self, soup):
+        """Return the article element (the whole soup if no selector matches)."""
+        for selector in self.content_selectors:
+            node = selector.select_one(soup)
+            if node is not None:
+                return node
+        return soup
+
+    def _too_small(self, img):
+        if not self.min_size:
+            return False
+        try:
+            return int(img.get('width', 0)) < self.min_size or int(img.get('height', 0)) < self.min_size
+        except ValueError:
+            return False
+
+    def _excluded(self, url, alt):
+        return bool(self.exclude_re) and bool(self.exclude_re.search(url) or self.exclude_re.search(alt))
+
+    def extract_images(self, root, base_url):
+        """
+        Return [{'url', 'alt', 'caption'}] for the content images under root.
+
+        img tags and <picture> sources are taken in document order; each URL
+        is reported once. For a srcset only the variant closest to the
+        WeChat width is taken (see srcset.best_candidate).
+        """
+        images = []
+        seen = set()
+        for node in root.find_all(['img', 'source']):
+            if node.name == 'source':
+                if node.parent is None or node.parent.name != 'picture' or not node.get('srcset'):
+                    continue
+                img = node.parent.find('img')
+                src = tag_source(node, img)
+            else:
+                src = tag_source(node)
+                img = node
+            if not src or src.startswith('data:') or (img is not None and self._too_small(img)):
+                continue
+
+            url = urljoin(base_url, src)
+            alt = img.get('alt', '') if img is not None else ''
+            if url in seen or self._excluded(url, alt):
+                continue
+            seen.add(url)
+
+            caption = ''
+            figure = node.find_parent('figure')
+            if figure:
+                caption_node = figure.find('figcaption') or figure.find(class_='ltx_caption')
+                if caption_node:
+                    caption = caption_node.get_text(' ', strip=True)
+            images.append({'url': url, 'alt': alt, 'caption': caption})
+        return images
+
+    def filename(self, image, index):
+        """Pick a filename for an image dict from extract_images()."""
+        url_name = unquote(Path(urlparse(image['url']).path).name)
+        url_stem, ext = Path(url_name).stem, Path(url_name).suffix.lower()
+        if ext not in IMAGE_EXTENSIONS:
+            ext = '.png'
+        alt = image.get('alt', '').strip()
+
+        candidates = []
+        if self.filename_rule == 'figure':
+            match = re.match(r'(?:Figure|Fig\.)\s*(\d+)', image.get('caption', ''))
+            if match:
+                candidates.append(f"figure_{match.group(1)}")
+            candidates.append(url_stem)
+        elif self.filename_rule == 'url':
+            candidates += [url_stem, alt[:50]]
+        else:
+            candidates += [alt.lower()[:50] if len(alt) > 3 else '', url_stem]
+
+        for candidate in candidates:
+            candidate = sanitize_filename(candidate)
+            if candidate and candidate.lower() not in ('image', 'img'):
+                return f"{candidate}{ext}"
+        return f"image_{index:03d}{ext}"
+
+    def markdown(self, root, base_url):
+        """Convert the article root to Markdown with the shared walker."""
+        return MarkdownWalker(base_url=base_url).walk(root)
+
+
+ADAPTERS = []
+
+
+def register(adapter):
+    """Add an adapter; adapters registered earlier win when patterns overlap."""
+    ADAPTERS.append(adapter)
+    return adapter
+
+
+register(SiteAdapter(
+    'huggingface', r'https?://huggingface\.co/blog/',
+    content_selectors=('article', 'main', 'div.container'),
+    exclude=('tracking',), min_size=50,
+))
+register(SiteAdapter(
+    'google-research', r'https?://research\.google/blog/',
+    content_selectors=('main', 'article', 'body'),
+    exclude=('logo', 'icon', 'avatar', 'profile', 'social', 'breadcrumb', 'arrow', 'navigation',
+             'header', 'footer'),
+))
+register(SiteAdapter(
+    'notion', r'https?://([\w-]+\.)?notion\.(so|site)/',
+    content_selectors=('.notion-page-content', 'main', 'body'),
+    kind='browser', exclude=('notion-emojis', 'icon'), filename_rule='url',
+    headers={'Referer': 'https://www.notion.so/'}, block_profile='notion',
+    scroll_selector='.notion-scroller',
+))
+register(SiteAdapter('arxiv-pdf', r'https?://arxiv\.org/pdf/', kind='pdf'))
+register(SiteAdapter(
+    'arxiv-html', r'https?://arxiv\.org/html/',
+    content_selectors=('article.ltx_document', 'body'),
+    exclude=('logo', 'icon', 'static/'), filename_rule='figure',
+))
+register(SiteAdapter(
+    'red-anthropic', r'https?://red\.anthropic\.com/',
+    content_selectors=('article', 'main', 'd-article', '[class*="content"]', 'body'),
+    exclude=('favicon', 'logo', 'icon', 'avatar'),
+    headers={'Referer': 'https://google.com'},
+))
+register(SiteAdapter(
+    'thinkingmachines', r'https?://thinkingmachines\.ai/blog/',
+    content_selectors=('article', 'main', 'body'),
+    exclude=('favicon', 'logo', 'icon'),
+))
+
+# Used for any URL no other adapter claims
+GENERIC = SiteAdapter(
+    'generic', r'.*',
+    content_selectors=('article', 'main', 'd-article', 'body'),
+    exclude=('favicon', 'logo', 'icon', 'avatar'),
+)
+
+
+def adapter_for(url):
+    """Return the registered adapter for url (GENERIC if none matches)."""
+    for adapter in ADAPTERS:
+        if adapter.matches(url):
+            return adapter
+    return GENERIC
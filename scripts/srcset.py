@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Pick the right variant from a srcset instead of the first one listed.
+
+The scrapers used srcset.split(',')[0], which is sometimes a tiny thumbnail
+and sometimes a 3x retina asset far larger than WeChat can show, and breaks
+on URLs that contain commas. best_candidate() parses the attribute properly
+and returns the smallest candidate that is at least TARGET_WIDTH pixels
+wide (the largest one if none is), so only one variant is downloaded and
+optimize_images has little or nothing left to resize.
+"""
+import re
+
+# Width the optimization stage scales figures down to (optimize_images.MAX_WIDTH)
+TARGET_WIDTH = 1080
+# Device pixel ratio of the phones the articles are read on
+DEVICE_PIXEL_RATIO = 3
+# CSS width assumed for x-descriptor candidates when the img has no width
+ASSUMED_CSS_WIDTH = 720
+
+_LENGTH_RE = re.compile(r'^([\d.]+)(px|vw)$', re.I)
+
+
+def parse_srcset(srcset):
+    """
+    Parse a srcset attribute into [{'url', 'width', 'density'}].
+
+    Follows the HTML parsing rules: candidates are separated by commas, but a
+    comma inside a URL (as in CDN transformation paths) is kept. width is
+    the w descriptor (or None); density is the x descriptor, 1.0 when the
+    candidate has no descriptor at all.
+    """
+    candidates = []
+    pos, end = 0, len(srcset or '')
+    while pos < end:
+        while pos < end and (srcset[pos].isspace() or srcset[pos] == ','):
+            pos += 1
+        if pos >= end:
+            break
+        start = pos
+        while pos < end and not srcset[pos].isspace():
+            pos += 1
+        url = srcset[start:pos]
+        descriptors = ''
+        if url.endswith(','):
+            url = url.rstrip(',')
+        else:
+            start, depth = pos, 0
+            while pos < end and (srcset[pos] != ',' or depth):
+                if srcset[pos] == '(':
+                    depth += 1
+                elif srcset[pos] == ')':
+                    depth = max(0, depth - 1)
+                pos += 1
+            descriptors = srcset[start:pos]
+
+        width = density = None
+        for descriptor in descriptors.split():
+            try:
+                if descriptor[-1] in 'wW':
+                    width = int(descriptor[:-1])
+                elif descriptor[-1] in 'xX':
+                    density = float(descriptor[:-1])
+            except ValueError:
+                continue
+        if url:
+            candidates.append({'url': url, 'width': width,
+                               'density': density if density or width else 1.0})
+    return candidates
+
+
+def slot_width(sizes, target_width=TARGET_WIDTH):
+    """
+    Device pixels needed for the layout slot described by a sizes attribute.
+
+    Media conditions cannot be evaluated without a viewport, so the default
+    (last) entry is used. px lengths are scaled by DEVICE_PIXEL_RATIO and vw
+    is taken relative to target_width. Returns None when sizes gives no
+    usable length.
+    """
+    if not sizes:
+        return None
+    default = sizes.split(',')[-1].strip().split()
+    match = _LENGTH_RE.match(default[-1]) if default else None
+    if not match:
+        return None
+    value, unit = float(match.group(1)), match.group(2).lower()
+    return round(value * DEVICE_PIXEL_RATIO if unit == 'px' else value / 100 * target_width)
+
+
+def best_candidate(srcset, sizes=None, width=None, target_width=TARGET_WIDTH):
+    """
+    Return the URL of the srcset candidate to download (None if srcset is empty).
+
+    Args:
+        srcset: srcset attribute value
+        sizes: Optional sizes attribute; a slot narrower than target_width
+            lowers the target
+        width: CSS width of the img (its width attribute), used to turn x
+            descriptors into pixels
+        target_width: Pixel width the figure will be shown at
+    """
+    candidates = parse_srcset(srcset)
+    if not candidates:
+        return None
+
+    slot = slot_width(sizes, target_width)
+    if slot:
+        target_width = min(target_width, slot)
+    try:
+        css_width = int(width)
+    except (TypeError, ValueError):
+        css_width = ASSUMED_CSS_WIDTH
+
+    def pixels(candidate):
+        if candidate['width']:
+            return candidate['width']
+        return candidate['density'] * css_width
+
+    large_enough = [c for c in candidates if pixels(c) >= target_width]
+    if large_enough:
+        return min(large_enough, key=pixels)['url']
+    return max(candidates, key=pixels)['url']
+
+
+def tag_source(tag, picture_img=None, target_width=TARGET_WIDTH):
+    """
+    Best URL for an img or <picture> source tag (BeautifulSoup Tag or attrs dict).
+
+    img tags use their srcset when present and src/data-src otherwise.
+    picture_img is the <picture>'s img, whose width applies to its sources.
+    """
+    img = picture_img if picture_img is not None else tag
+    url = best_candidate(tag.get('srcset') or tag.get('data-srcset'), tag.get('sizes'),
+                         img.get('width'), target_width)
+    return url or tag.get('src') or tag.get('data-src')
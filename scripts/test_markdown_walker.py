@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Tests for markdown_walker: nested code fences and GFM tables.
+
+Run with: python -m pytest scripts/test_markdown_walker.py
+
+Each case is also run through the converter scrape_hf_blog used before
+MarkdownWalker (find_all over a tag list plus get_text), to check that no
+text it extracted is lost.
+"""
+import pytest
+
+bs4 = pytest.importorskip('bs4')
+from markdown_walker import to_markdown  # noqa: E402
+
+
+OLD_TAGS = ['p', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'pre', 'code', 'li', 'blockquote', 'td', 'th']
+
+
+def old_convert(root):
+    """
+    The pre-walker scrape_hf_blog extraction: one get_text() per matching tag.
+
+    Only innermost matches are kept; the old converter also printed their
+    ancestors' text run together (e.g. 'twoa=1'), which is the bug the walker
+    fixed and not something to compare against.
+    """
+    parts = []
+    for element in root.find_all(OLD_TAGS):
+        if element.find(OLD_TAGS) is not None:
+            continue
+        text = element.get_text().strip()
+        if text:
+            parts.append(text)
+    return parts
+
+
+def convert(html):
+    soup = bs4.BeautifulSoup(html, 'html.parser')
+    return to_markdown(soup), old_convert(soup)
+
+
+def assert_keeps_old_text(markdown, old_parts):
+    """Every non-blank line the old converter produced must still be in the output."""
+    for part in old_parts:
+        for line in part.split('\n'):
+            if line.strip():
+                assert line.strip() in markdown
+
+
+def test_pre_inside_list_item_stays_in_the_item():
+    markdown, old = convert(
+        '<ul><li>one</li><li>two<pre class="language-py">a=1\n\n    b=2</pre></li></ul>')
+    assert markdown == '- one\n- two\n  ```py\n  a=1\n  \n      b=2\n  ```'
+    assert_keeps_old_text(markdown, old)
+
+
+def test_pre_inside_blockquote_is_quoted_on_every_line():
+    markdown, old = convert('<blockquote><p>Note</p><pre>x\ny</pre></blockquote>')
+    assert markdown == '> Note\n>\n> ```\n> x\n> y\n> ```'
+    assert_keeps_old_text(markdown, old)
+
+
+def test_top_level_pre_keeps_blank_lines():
+    markdown, old = convert('<p>Intro</p><pre><code class="language-sh">a\n\n\nb</code></pre>')
+    assert markdown == 'Intro\n\n```sh\na\n\n\nb\n```'
+    assert_keeps_old_text(markdown, old)
+
+
+def test_table_is_gfm_with_header_row():
+    markdown, old = convert(
+        '<table><thead><tr><th>Model</th><th>a|b</th></tr></thead>'
+        '<tbody><tr><td>x</td><td><b>1</b></td></tr><tr><td>y</td></tr></tbody></table>')
+    assert markdown == '| Model | a\\|b |\n| --- | --- |\n| x | **1** |\n| y |  |'
+    assert_keeps_old_text(markdown.replace('\\|', '|'), old)
+
+
+def test_nested_table_rows_stay_in_their_own_table():
+    markdown, _ = convert(
+        '<table><tr><td>outer</td></tr><tr><td><table><tr><td>inner</td></tr></table></td></tr></table>')
+    assert markdown.split('\n')[:2] == ['| outer |', '| --- |']
+    assert markdown.count('| --- |') == 1